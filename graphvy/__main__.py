@@ -1,4 +1,5 @@
 import os
+import time
 
 from kivy.animation import Animation
 from kivy.properties import NumericProperty
@@ -8,10 +9,11 @@ from kivy.core.window import Window
 from .constants import *
 
 from .graph_canvas.graph_canvas import GraphCanvas
+from .run import load_rule
 from .console.graphvy_console import GraphvyConsole
 from .ui.colored_drop_down_item import ColoredDropdownItem
 from .ui.md_filechooser import FileChooser
-from .ui.ui_widgets import ToolIcon, MenuItem, BurgerButton, RandomGraphDialogue, ColoredMenu
+from .ui.ui_widgets import ToolIcon, MenuItem, BurgerButton, RandomGraphDialogue, ColoredMenu, PlaybackBar
 
 
 class Graphvy(MDApp):
@@ -33,12 +35,17 @@ class Graphvy(MDApp):
 
         self.prop_menu = ColoredMenu(caller=self.root, position='auto', width_mult=2, background_color=SELECTED_COLOR)
 
-        self.console = GraphvyConsole(locals={'G': self.root.ids.graph_canvas.G})
+        self.console = GraphvyConsole(locals={'G': self.root.ids.graph_canvas.G,
+                                              'profiler': self.root.ids.graph_canvas.profiler})
         self.root.ids.graph_canvas.console = self.console
         self.root.add_widget(self.console)
 
         self.root.bind(size=self._resize)
         Window.bind(on_key_down=self.animate_console)
+        Window.bind(on_key_down=self.toggle_hud)
+
+    def on_stop(self):
+        self.root.ids.graph_canvas.stop_recording()
 
     def on_tab_switch(self, tabs, tab, label, text):
         self.root.ids.header.title = tab.title
@@ -59,6 +66,10 @@ class Graphvy(MDApp):
         self.console.focus, x = (False, 0) if self._console_top else (True, PANEL_HEIGHT)
         Animation(_console_top=x, duration=.7, t='out_cubic').start(self)
 
+    def toggle_hud(self, *args):
+        if args[1] == 284:  # F3
+            self.root.ids.graph_canvas.hud.toggle()
+
     def _resize(self, *args):
         if self._anim_progress:
             self._anim_progress = -self.root.ids.side_panel.width / self.root.width
@@ -81,15 +92,22 @@ class Graphvy(MDApp):
         gc = self.root.ids.graph_canvas
 
         if os.path.splitext(path)[1] == '.py':
-            with open(path, 'r') as code:
-                code = code.read()
+            gc.load_rule(load_rule(path))
+            return
 
-            l = {}
-            exec(code, None, l)
-            gc.load_rule(l['rule'])
+        if os.path.splitext(path)[1] == '.json':  # A recording's header
+            gc.play_recording(os.path.dirname(path))
+            self.root.ids.playback_bar.player = gc.player
             return
 
-        gc.G.save(path, fmt='gt') if is_save else gc.load_graph(G=path)
+        gc.G.save(path, fmt='gt') if is_save else gc.load_graph_async(G=path)
+
+    def toggle_recording(self):
+        gc = self.root.ids.graph_canvas
+        if gc.recorder is not None:
+            gc.stop_recording()
+        else:
+            gc.start_recording(os.path.join(os.getcwd(), 'graphvy', 'recordings', time.strftime('%Y-%m-%d_%H-%M-%S')))
 
     def show_file_chooser(self, dir_, save, ext):
         self.is_file_selecting = True
@@ -0,0 +1,238 @@
+"""
+Benchmarks of the canvas, layout and rule hot paths on random graphs of several sizes:
+
+    python -m graphvy.bench --edges 1000 10000 100000 1000000 --out bench.json
+
+Canvas benchmarks draw to a hidden Kivy window.  Kivy's SDL2 window still needs a display, so on a machine without
+one run them under a virtual display: `xvfb-run python -m graphvy.bench`.  Rule benchmarks (`--only rules`) and
+`--steady-state` don't import Kivy and run anywhere.  Results are written as JSON tagged with the current git commit
+so that runs can be compared across commits.
+
+`--steady-state` also checks that EdgeCentricGASEP.step_batch has the same steady state as EdgeCentricGASEP.step.
+"""
+from argparse import ArgumentParser
+from inspect import unwrap
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import graph_tool as gt
+import numpy as np
+
+from .graph_canvas.layout_engines import BarnesHutEngine
+from .observable_graph import ObservableGraph
+from .random_graphs import erdos_random_graph
+from .rules.bases.dynamic_graph import AsyncDynamicBase, EdgeCentricGASEP, EdgeFlipGASEP, Gravity
+from .run import run
+
+EDGES = 1_000, 10_000, 100_000, 1_000_000
+VERTICES_PER_EDGE = 5 / 8  # Same ratio as the default random graph, 50 nodes and 80 edges.
+CANVAS_SIZE = 1280, 720
+RULES = EdgeCentricGASEP, EdgeFlipGASEP, Gravity
+RULE_STEPS = 10_000  # per repeat
+CALLS = 100  # per repeat, for benchmarks of single cheap calls
+STEADY_STATE = dict(edges=2_000, burn_in=200_000, samples=200, every=1_000)  # of each chain
+CHAINS = 4  # of each of step and step_batch, for the steady state check
+
+
+def timeit(func, repeat, calls=1, setup=None):
+    """
+    Time `repeat` runs of `func` (each run makes `calls` calls, seconds are per call).  `setup` is called, untimed,
+    before each run.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        times.append((time.perf_counter() - start) / calls)
+
+    return dict(best=min(times), mean=sum(times) / repeat, repeat=repeat, calls=calls)
+
+
+def random_graph(edges, seed):
+    """Reproducible random graph with `edges` edges."""
+    random.seed(seed)  # Of the benchmarks' mouse positions and edits
+    gt.seed_rng(seed)
+    return erdos_random_graph(max(int(edges * VERTICES_PER_EDGE), 2), edges, prune=False, rng=seed)
+
+
+def import_canvas():
+    """Import GraphCanvas, which creates Kivy's window: hidden, but it still needs a display."""
+    if sys.platform.startswith('linux') and not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY')):
+        sys.exit('canvas benchmarks need a display for their Kivy window; run them under xvfb-run '
+                 'or pass --only rules.')
+
+    os.environ.setdefault('KIVY_NO_ARGS', '1')  # Kivy would otherwise parse our arguments.
+
+    from kivy.config import Config
+    Config.set('graphics', 'window_state', 'hidden')  # Before the window is created by importing GraphCanvas.
+
+    from .graph_canvas.graph_canvas import GraphCanvas
+    return GraphCanvas
+
+
+def bench_canvas(G, repeat, seed):
+    GraphCanvas = import_canvas()
+    canvas = GraphCanvas(G=G, size=CANVAS_SIZE, seed=seed)
+    canvas.pause_layout()
+    canvas.layout_worker.stop()  # Layout steps are timed synchronously below.
+    canvas.resize_event.cancel()  # The Clock isn't ticked, so a pending resize would make update_canvas a no-op.
+
+    update_canvas = unwrap(GraphCanvas.update_canvas)  # Not rate limited
+    update_canvas(canvas)
+    if canvas.coords is None or canvas.edge_array is None:
+        raise RuntimeError('update_canvas drew nothing; the benchmark would time a no-op')
+
+    width, height = CANVAS_SIZE
+    results = {}
+
+    results['update_canvas'] = timeit(lambda: update_canvas(canvas), repeat)
+    results['transform_coords'] = timeit(canvas.transform_coords, repeat)
+    results['step_layout'] = timeit(lambda: canvas.step_layout(0), repeat)
+
+    worker = canvas.layout_worker
+    request = (worker._epoch, 0, canvas._vertex_generation, canvas._edge_generation, canvas.edge_array[:, :2],
+               canvas.G.vp.pos.get_2d_array((0, 1)), canvas.G.vp.pinned.a.astype(bool))
+    worker._step(*request)  # Builds the worker's copy of the graph.
+    results['layout_worker_step'] = timeit(lambda: worker._step(*request), repeat)
+
+    worker.engine = BarnesHutEngine()
+    results['barnes_hut_step'] = timeit(lambda: worker._step(*request), repeat)
+
+    on_mouse_pos = unwrap(GraphCanvas.on_mouse_pos)
+    mouse = lambda: on_mouse_pos(canvas, None, (random.uniform(0, width), random.uniform(0, height)))
+    results['on_mouse_pos'] = timeit(mouse, repeat, CALLS)
+
+    def drag_select():
+        x, y = random.uniform(0, .7 * width), random.uniform(0, .7 * height)
+        canvas.on_drag_select(SimpleNamespace(ox=x, oy=y, x=x + .3 * width, y=y + .3 * height))
+
+    results['on_drag_select'] = timeit(drag_select, repeat, CALLS)
+    canvas._selected.a[:] = 0
+    canvas.refresh_pins()
+
+    n = canvas.G.num_vertices()
+    results['add_edge'] = timeit(lambda: canvas.G.add_edge(random.randrange(n), random.randrange(n)), repeat, CALLS)
+
+    def remove_vertex():
+        canvas.G.remove_vertex(canvas.G.vertex(random.randrange(canvas.G.num_vertices())))
+
+    results['remove_vertex'] = timeit(remove_vertex, repeat, max(min(CALLS, n // (2 * repeat)), 1))
+
+    return results
+
+
+def bench_rules(G, repeat, seed):
+    results = {}
+    for rule in RULES:
+        H = ObservableGraph(G)
+        H.set_fast_edge_removal()
+        rule_callback = rule(H, rng=seed)
+        results[f'{rule.__name__}.step'] = timeit(rule_callback.step, repeat, RULE_STEPS)
+
+        if rule.step_batch is not AsyncDynamicBase.step_batch:  # Vectorized; batches as large as the graph pay off.
+            steps = max(RULE_STEPS, H.num_edges())
+            result = timeit(lambda: rule_callback.step_batch(steps), repeat)
+            result.update(best=result['best'] / steps, mean=result['mean'] / steps, calls=steps)
+            results[f'{rule.__name__}.step_batch'] = result
+        rule_callback.close()
+    return results
+
+
+def out_degrees(rule, batch, graph_seed, rule_seed, edges, burn_in, samples, every):
+    """Mean out-degree distribution of `rule` on a random graph, sampled every `every` steps after `burn_in`."""
+    G = ObservableGraph(random_graph(edges, graph_seed))
+    G.set_fast_edge_removal()
+    rule_callback = rule(G, rng=rule_seed)
+
+    run(rule_callback, burn_in, batch=batch and burn_in)
+    total = np.zeros(1)
+    for _ in range(samples):
+        run(rule_callback, every, batch=batch and every)
+        counts = np.bincount(G.get_out_degrees(G.get_vertices()).astype(np.int64)).astype(float)
+        if len(counts) > len(total):
+            total = np.pad(total, (0, len(counts) - len(total)))
+        total[:len(counts)] += counts
+
+    rule_callback.close()
+    return total / total.sum()
+
+
+def check_steady_state(seed, rule=EdgeCentricGASEP, chains=CHAINS, settings=STEADY_STATE):
+    """
+    Compare the steady-state out-degree distributions of `chains` differently seeded runs each of rule.step and
+    rule.step_batch, from the same random graph.  `distance` is the mean total variation distance between a run of
+    step and a run of step_batch and `noise` the mean distance between two runs of the same method: the steady
+    states match if the distance is within 1.5 times the noise.
+    """
+    def distance(p, q):
+        n = max(len(p), len(q))
+        return .5 * np.abs(np.pad(p, (0, n - len(p))) - np.pad(q, (0, n - len(q)))).sum()
+
+    sequential = [out_degrees(rule, False, seed, seed + i, **settings) for i in range(chains)]
+    batched = [out_degrees(rule, True, seed, seed + chains + i, **settings) for i in range(chains)]
+
+    between = np.mean([distance(p, q) for p in sequential for q in batched])
+    noise = np.mean([distance(runs[i], runs[j])
+                     for runs in (sequential, batched) for i in range(chains) for j in range(i)])
+    return dict(rule=rule.__name__, distance=between, noise=noise, matches=bool(between <= 1.5 * noise),
+                chains=chains, **settings)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = ArgumentParser(prog='python -m graphvy.bench', description='Benchmark Graphvy hot paths.')
+    parser.add_argument('--edges', type=int, nargs='+', default=EDGES, help='edges of each random graph')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs of each benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random graphs')
+    parser.add_argument('--only', choices=('canvas', 'rules'), help='run only canvas or only rule benchmarks')
+    parser.add_argument('--steady-state', action='store_true',
+                        help='also check that step_batch has the same steady state as step')
+    parser.add_argument('--out', default='bench.json', help='JSON file for the results')
+    args = parser.parse_args()
+    if args.only != 'rules':
+        import_canvas()  # Fail before any benchmarks run.
+
+    report = dict(commit=git_commit(), python=platform.python_version(), platform=platform.platform(),
+                  graph_tool=gt.__version__, seed=args.seed, repeat=args.repeat, results=[])
+
+    for edges in args.edges:
+        benchmarks = {}
+        if args.only != 'rules':
+            benchmarks.update(bench_canvas(random_graph(edges, args.seed), args.repeat, args.seed))
+        if args.only != 'canvas':
+            benchmarks.update(bench_rules(random_graph(edges, args.seed), args.repeat, args.seed))
+
+        vertices = max(int(edges * VERTICES_PER_EDGE), 2)
+        for name, result in benchmarks.items():
+            report['results'].append(dict(benchmark=name, edges=edges, vertices=vertices, **result))
+            print(f'{name:>24} E={edges:<9} '
+                  f'best {result["best"] * 1e3:10.4f} ms  mean {result["mean"] * 1e3:10.4f} ms', flush=True)
+
+    if args.steady_state:
+        report['steady_state'] = check = check_steady_state(args.seed)
+        print(f'{check["rule"]}.step_batch steady state: distance {check["distance"]:.4f} '
+              f'(noise {check["noise"]:.4f}) -- {"matches" if check["matches"] else "DIFFERS"}', flush=True)
+
+    with open(args.out, 'w') as file:
+        json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -37,7 +37,7 @@ class GraphvyConsole(CodeInput):
         self.input_handler = InputHandler(self)
 
         self.text = (f'Python {sys.version.splitlines()[0]}\n'
-                     'Welcome to the GraphvyConsole -- `G` references current graph.\n')
+                     'Welcome to the GraphvyConsole -- `G` references current graph, `profiler` the frame profiler.\n')
         self.prompt()
 
     def prompt(self, needs_more=False):
@@ -6,10 +6,29 @@ SFDP_SETTINGS = dict(init_step=0.005,  # move step; increase for sfdp to converg
                      p=2.0,            # repulsive force exponent
                      max_iter=2)
 
+BARNES_HUT_SETTINGS = dict(theta=.8,      # larger is faster and less accurate
+                           leaf_size=8,    # points per quadtree leaf
+                           K=0.5, C=0.3, p=2.0, init_step=0.005, max_iter=1)
+
+LOCAL_LAYOUT = dict(hops=2,           # local layout steps move vertices this many hops from a changed edge
+                    steps=10,         # for this many steps after the change
+                    global_every=60)  # and every this many steps the whole graph is laid out
+
+CONVERGENCE = dict(window=30,          # the layout's movement is measured over this many steps
+                   tolerance=1e-3,     # it has converged when vertices moved less than this per step, on average
+                   idle_interval=None)  # then it's stepped every this many seconds, or not at all if None, until woken
+
 TOOLS = 'Grab', 'Select', 'Pin', 'Show Path', 'Add Node', 'Delete Node', 'Add Edge', 'Delete Edge'
 
 UPDATE_INTERVAL = 1/60
 
+PARTIAL_REDRAW_FRACTION = .25  # Redraw everything instead of only what changed if more vertices than this changed.
+
+PLAYBACK_SPEED = 100  # steps per second when a recording starts playing; each fast-forward or rewind doubles it
+
+RULE_BUDGET = .008  # seconds of rule steps per frame
+RULE_STEPS = None   # if set, a fixed number of rule steps per frame instead of RULE_BUDGET
+
 # Colors
 BACKGROUND_COLOR  =     0,     0,     0,   1
 
@@ -39,5 +58,13 @@ NODE_WIDTH    = 3
 EDGE_WIDTH    = 2
 SELECT_WIDTH  = 1.2
 
+# Level of detail, in pixels
+LOD = dict(margin=NODE_RADIUS + NODE_WIDTH,  # nodes (and edges) this far outside the canvas are culled
+           min_head_length=4 * HEAD_SIZE,  # edges shorter than this are drawn without arrow heads
+           min_ring_spacing=4 * (NODE_RADIUS + NODE_WIDTH),  # nodes are filled discs, not rings, when drawn
+                                                             # nodes are closer than this apart on average
+           cell=2 * NODE_RADIUS)           # if more nodes are visible than there are cells of this size on the
+                                           # canvas, only one node per cell is drawn
+
 PANEL_WIDTH   = .3
 PANEL_HEIGHT  = .3
\ No newline at end of file
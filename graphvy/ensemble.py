@@ -0,0 +1,226 @@
+"""
+Ensembles of independent runs of a rule from the same initial graph, in parallel on all cores:
+
+    python -m graphvy.ensemble Gravity graph.gt --runs 200 --steps 1000000 --every 10000 --out ensemble.json
+
+`rule` is one of the rules in RULES or a py file that defines `rule` (as for graphvy.run).  Each run has its own
+seed; observables are sampled every `every` steps, streamed back from the workers as they're taken and aggregated
+into a mean and standard deviation per observable per sample.
+"""
+from argparse import ArgumentParser
+import json
+import multiprocessing
+import queue
+import random
+import time
+
+import graph_tool as gt
+from graph_tool import Graph
+from graph_tool.topology import label_components
+import numpy as np
+
+from .observable_graph import ObservableGraph
+from .rules.bases.dynamic_graph import EdgeCentricGASEP, EdgeFlipGASEP, Gravity
+from .run import load_rule, run, start_rule
+
+RULES = {rule.__name__: rule for rule in (EdgeCentricGASEP, EdgeFlipGASEP, Gravity)}
+POLL_INTERVAL = .1  # seconds between checks for failed workers while waiting for samples
+
+
+def degrees(G):
+    """Number of vertices of each total degree."""
+    return np.bincount(G.get_total_degrees(G.get_vertices()).astype(np.int64))
+
+
+def components(G):
+    """Number of (weakly) connected components."""
+    if not G.num_vertices():
+        return 0
+    return len(label_components(G, directed=False)[1])
+
+
+def flavors(G):
+    """Number of edges of each flavor in `ep.flavors` (photons, matter, antimatter for Gravity)."""
+    if 'flavors' not in G.ep:
+        return np.zeros(0, dtype=np.int64)
+    return np.bincount(G.get_edges([G.ep.flavors])[:, 2], minlength=3)
+
+
+OBSERVABLES = dict(degrees=degrees, components=components, flavors=flavors,
+                   vertices=Graph.num_vertices, edges=Graph.num_edges)
+
+
+class Aggregate:
+    """
+    Running sums of each observable at each sampled step, from which `mean` and `std` are computed.  Observables may
+    be scalars or 1-d arrays (e.g., distributions); arrays of different lengths are padded with zeros.
+    """
+
+    def __init__(self):
+        self.runs = {}  # (observable, step) -> number of samples
+        self.sums = {}
+        self.squares = {}
+        self.scalar = {}  # observable -> whether its samples are scalars
+
+    def add(self, step, values):
+        for name, value in values.items():
+            self.scalar[name] = np.ndim(value) == 0
+            value = np.atleast_1d(np.asarray(value, dtype=float))
+            key = name, step
+            self.runs[key] = self.runs.get(key, 0) + 1
+            self.sums[key] = _add_padded(self.sums.get(key), value)
+            self.squares[key] = _add_padded(self.squares.get(key), value ** 2)
+
+    def mean(self, name, step):
+        return self.sums[name, step] / self.runs[name, step]
+
+    def std(self, name, step):
+        mean = self.mean(name, step)
+        return np.sqrt(np.maximum(self.squares[name, step] / self.runs[name, step] - mean ** 2, 0))
+
+    def to_dict(self):
+        """Per observable, a list of samples (step, runs, mean, std), in step order."""
+        result = {}
+        for name, step in sorted(self.runs):
+            mean, std = self.mean(name, step), self.std(name, step)
+            scalar = self.scalar[name]
+            result.setdefault(name, []).append(dict(step=step, runs=self.runs[name, step],
+                                                    mean=mean[0] if scalar else mean.tolist(),
+                                                    std=std[0] if scalar else std.tolist()))
+        return result
+
+
+def _add_padded(total, value):
+    if total is None:
+        return value.copy()
+    if len(total) < len(value):
+        total = np.pad(total, (0, len(value) - len(total)))
+    total[:len(value)] += value
+    return total
+
+
+def seeds(seed, runs):
+    """Independent seeds for each of `runs` runs."""
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(runs)]
+
+
+# --- Worker processes ---
+_worker = {}  # Initial graph, rule and sample queue of this worker process
+
+
+def _init_worker(graph, rule, samples):
+    _worker.update(graph=gt.load_graph(graph, fmt='gt'), rule=_resolve_rule(rule), samples=samples)
+
+
+def _resolve_rule(rule):
+    return RULES[rule] if rule in RULES else load_rule(rule)
+
+
+def _run(task):
+    """Run the rule once from a copy of the initial graph, putting a sample on the queue every `every` steps."""
+    index, seed, steps, every, observables, batch = task
+    random.seed(seed)  # For rule files that draw from the random module
+    gt.seed_rng(seed)
+
+    G = ObservableGraph(_worker['graph'])
+    G.set_fast_edge_removal()
+    rule_callback = start_rule(_worker['rule'], G, seed)
+    samples = _worker['samples']
+
+    def sample(step):
+        samples.put((index, step, {name: OBSERVABLES[name](G) for name in observables}))
+
+    sample(0)
+    run(rule_callback, steps, snapshot_every=every, snapshot=sample, batch=batch)
+    if not every or steps % every:
+        sample(steps)
+
+    if hasattr(rule_callback, 'close'):
+        rule_callback.close()
+    return index
+
+
+def run_ensemble(graph, rule, runs, steps, every, *, observables=('components',), seed=0, processes=None,
+                 batch=0, on_sample=None):
+    """
+    Run `rule` (a name in RULES or a rule file) `runs` times for `steps` steps from the gt file `graph`, on
+    `processes` processes (default: one per core).  Returns an Aggregate of `observables` (names in OBSERVABLES)
+    sampled every `every` steps.  If `batch`, rules are stepped with step_batch, up to `batch` steps at a time.
+    `on_sample(run, step, values)` is called for each sample as it arrives.
+    """
+    unknown = set(observables) - OBSERVABLES.keys()
+    if unknown:
+        raise ValueError(f'unknown observables: {", ".join(sorted(unknown))}')
+    _resolve_rule(rule)  # Fail early, not in every worker.
+
+    aggregate = Aggregate()
+    tasks = [(index, run_seed, steps, every, tuple(observables), batch)
+             for index, run_seed in enumerate(seeds(seed, runs))]
+    samples = multiprocessing.Queue()
+
+    with multiprocessing.Pool(processes, _init_worker, (graph, rule, samples)) as pool:
+        result = pool.map_async(_run, tasks, chunksize=1)
+        expected = runs * (1 + (steps // every if every else 0) + (not every or steps % every != 0))
+
+        while expected:
+            try:
+                index, step, values = samples.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if result.ready() and not result.successful():
+                    result.get()  # Raises the worker's exception.
+                continue
+
+            aggregate.add(step, values)
+            if on_sample is not None:
+                on_sample(index, step, values)
+            expected -= 1
+
+        result.get()
+
+    return aggregate
+
+
+def main():
+    parser = ArgumentParser(prog='python -m graphvy.ensemble', description='Run an ensemble of a Graphvy rule.')
+    parser.add_argument('rule', help=f'one of {", ".join(RULES)} or a py file that defines `rule`')
+    parser.add_argument('graph', help='gt file of the initial graph')
+    parser.add_argument('--runs', type=int, required=True, help='number of independent runs')
+    parser.add_argument('--steps', type=int, required=True, help='rule steps per run')
+    parser.add_argument('--every', type=int, default=0, help='steps between samples (default: first and last)')
+    parser.add_argument('--observables', nargs='+', choices=OBSERVABLES, default=['components'],
+                        help='observables to sample')
+    parser.add_argument('--seed', type=int, default=0, help='seed from which the seed of each run is derived')
+    parser.add_argument('--processes', type=int, help='worker processes (default: one per core)')
+    parser.add_argument('--batch', type=int, default=0,
+                        help='steps per call of the rule\'s step_batch (default: step one at a time)')
+    parser.add_argument('--samples', help='also write every sample of every run to this JSON lines file')
+    parser.add_argument('--out', default='ensemble.json', help='JSON file for the aggregated observables')
+    args = parser.parse_args()
+
+    samples_file = open(args.samples, 'w') if args.samples else None
+    finished = set()
+    start = time.perf_counter()
+
+    def on_sample(index, step, values):
+        if samples_file is not None:
+            values = {name: np.asarray(value).tolist() for name, value in values.items()}
+            samples_file.write(json.dumps(dict(run=index, step=step, **values)) + '\n')
+        if step == args.steps:
+            finished.add(index)
+            print(f'{len(finished)}/{args.runs} runs  {time.perf_counter() - start:,.1f} s', flush=True)
+
+    try:
+        aggregate = run_ensemble(args.graph, args.rule, args.runs, args.steps, args.every,
+                                 observables=args.observables, seed=args.seed, processes=args.processes,
+                                 batch=args.batch, on_sample=on_sample)
+    finally:
+        if samples_file is not None:
+            samples_file.close()
+
+    with open(args.out, 'w') as file:
+        json.dump(dict(rule=args.rule, graph=args.graph, runs=args.runs, steps=args.steps, every=args.every,
+                       seed=args.seed, observables=aggregate.to_dict()), file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
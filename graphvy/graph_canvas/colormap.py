@@ -2,27 +2,44 @@ import palettable
 import numpy as np
 from ..constants import NODE_COLOR, EDGE_COLOR
 
+LUT_SIZE = 256  # colors sampled from continuous colormaps
+
 
 class ContinuousMap:
-    def __init__(self, colormap, start, end):
-        self.scale = end - start
+    """
+    Maps values in [start, end] to colors.  The colormap is sampled once into a lookup table, so coloring a whole
+    property array is a single gather.  Values outside the range get the color of the nearest end.
+    """
+    def __init__(self, colormap, start, end, size=LUT_SIZE):
+        self.scale = (end - start) or 1
         self.start = start
         self.colormap = colormap
+        self.lut = colormap(np.linspace(0, 1, size))
 
     def __getitem__(self, key):
-        return self.colormap((key - self.start) / self.scale)
+        indices = (np.asarray(key, dtype=float) - self.start) * ((len(self.lut) - 1) / self.scale)
+        indices = np.clip(np.rint(np.nan_to_num(indices)), 0, len(self.lut) - 1).astype(np.intp)
+        return self.lut[indices]
+
+
+def colors_from(colormap, values):
+    """Return an (N, 4) array of the colors that `colormap` assigns to each of `values`."""
+    if isinstance(colormap, ContinuousMap):
+        return colormap[values]
+    return np.take(colormap, values.astype(np.intp), axis=0, mode='clip')
 
 
 def get_colormap(states=1, end=None, *, for_nodes=True):
     """
     Returns a color map for an arbitrary number of states, or a continuous range of states if `end` is not None.
-    Note that if there are 10 or less states the colors are not sequential.
+    Note that if there are 10 or less states the colors are not sequential.  Maps of discrete states are (states, 4)
+    arrays, i.e., lookup tables indexed by state.
     """
     if end is None:
         if states == 1:
-            return [NODE_COLOR if for_nodes else EDGE_COLOR]
+            return np.array([NODE_COLOR if for_nodes else EDGE_COLOR], dtype=float)
         if states <= 10:
             colors = getattr(palettable.cartocolors.qualitative, f'Vivid_{states}').mpl_colors
-            return [(*color, 1) for color in colors]
+            return np.array([(*color, 1) for color in colors], dtype=float)
         return palettable.cartocolors.sequential.Emrld_7.mpl_colormap(np.linspace(0, 1, states))
     return ContinuousMap(palettable.cartocolors.sequential.Emrld_7.mpl_colormap, states, end)
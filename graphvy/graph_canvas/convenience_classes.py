@@ -1,98 +1,12 @@
 """Convenience classes for Graphvy"""
-from random import random
+from contextlib import contextmanager
+import os
 
-from graph_tool import Graph
 from kivy.graphics import Color, Line
+import numpy as np
 
-from .arrow import Arrow
 from ..constants import *
-from ..ui.ui_widgets import AdjacencyListItem
-
-
-class Node(Line):
-    __slots__ = 'color', 'vertex', 'canvas', 'group_name', 'list_item'
-
-    def __init__(self, vertex, canvas):
-        self.group_name = str(id(self))
-
-        self.vertex = vertex
-        self.canvas = canvas
-
-        color = canvas.node_colormap[canvas.node_colors[vertex]]
-        self.color = Color(*color, group=self.group_name)
-        super().__init__(width=NODE_WIDTH, group=self.group_name)
-
-        self.list_item = None  # Set in make_list_item
-
-    def update_out_edges(self):
-        for edge in self.vertex.out_edges():
-            self.canvas.edges[edge].update()
-
-    def freeze(self, color=None):
-        self.canvas.G.vp.pinned[self.vertex] = 1
-        if color is not None:
-            self.color.rgba = color
-
-            if self.list_item is not None:
-                self.list_item.md_bg_color = ALT_SELECTED_COLOR if color == SELECTED_COLOR else color
-
-        self.update_out_edges()
-
-    def unfreeze(self):
-        canvas = self.canvas
-        canvas.G.vp.pinned[self.vertex] = 0
-        self.color.rgba = canvas.node_colormap[canvas.node_colors[self.vertex]]
-        if self.list_item is not None:
-            self.list_item.md_bg_color = SELECTED_COLOR
-        self.update_out_edges()
-
-    def collides(self, mx, my):
-        x, y = self.canvas.coords[int(self.vertex)]
-        return abs(x - mx) <= BOUNDS and abs(y - my) <= BOUNDS
-
-    def make_list_item(self, adj):
-        self.list_item = AdjacencyListItem(self)
-        adj.add_widget(self.list_item)
-
-    def update(self):
-        canvas = self.canvas
-        if not canvas.G.vp.pinned[self.vertex]:
-            self.color.rgba = canvas.node_colormap[canvas.node_colors[self.vertex]]
-        self.circle = *canvas.coords[int(self.vertex)], NODE_RADIUS
-
-
-class Edge(Arrow):
-    __slots__ = 'edge', 's', 't', 'canvas', '_directed'
-
-    def __init__(self, edge, canvas, directed=True):
-        self.edge = edge
-        self.s, self.t = edge
-        self.canvas = canvas
-        self._directed = directed
-
-        super().__init__(width=EDGE_WIDTH, head_size=HEAD_SIZE)
-
-    @property
-    def directed(self):
-        return self._directed
-
-    @directed.setter
-    def directed(self, boolean):
-        self._directed = self.head.color.a = boolean
-
-    def update(self):
-        x1, y1, x2, y2 = *self.canvas.coords[int(self.s)], *self.canvas.coords[int(self.t)]
-        self.points = x1, y1, x2, y2
-        if self.directed:
-            self.head.update(x1, y1, x2, y2)
-
-        if self.canvas.G.vp.pinned[self.s]:
-            color = HIGHLIGHTED_EDGE
-        else:
-            color = self.canvas.edge_colormap[self.canvas.edge_colors[self.edge]]
-        hcolor =  tuple(min(c * 1.2, 1) for c in color)
-        self.color.rgba = color
-        self.head.color.rgba = hcolor
+from ..observable_graph import ObservableGraph
 
 
 class Selection(Line):
@@ -118,129 +32,139 @@ class Selection(Line):
         return self.min_x <= x <= self.max_x and self.min_y <= y <= self.max_y
 
 
-class NodeSet(set):
-    """Set that correctly colors nodes that are added to/removed from it."""
-    color = NODE_COLOR
-
-    def add(self, node):
-        super().add(node)
-        node.freeze(self.color)
-
+class ProgressReader:
+    """Wraps a binary file; `progress(fraction)` is called as the file is read, every `every` of the file."""
+    __slots__ = 'file', 'progress', 'size', 'every', '_read', '_reported'
 
-class SelectedSet(NodeSet):
-    color = SELECTED_COLOR
+    def __init__(self, file, progress, every=.01):
+        self.file = file
+        self.progress = progress
+        self.size = max(os.fstat(file.fileno()).st_size, 1)
+        self.every = every
+        self._read = self._reported = 0
 
-    def remove(self, node):
-        super().remove(node)
-        node.unfreeze()
+    def read(self, n=-1):
+        data = self.file.read(n)
+        self._advance(len(data))
+        return data
 
+    def readinto(self, buffer):
+        n = self.file.readinto(buffer)
+        self._advance(n or 0)
+        return n
 
-class PinnedSet(NodeSet):
-    color = PINNED_COLOR
+    def _advance(self, n):
+        self._read += n
+        if (fraction := self._read / self.size) - self._reported >= self.every:
+            self._reported = fraction
+            self.progress(fraction)
 
-    def remove(self, node, unfreeze=False):
-        super().remove(node)
-        if unfreeze:
-            node.unfreeze()
-        else:
-            node.color.rgba = HIGHLIGHTED_NODE
+    def __getattr__(self, name):
+        return getattr(self.file, name)
 
 
-class GraphInterface(Graph):
+class GraphInterface(ObservableGraph):
     """
     An interface from a graph_tool Graph to the graph canvas that updates the canvas when an edge/vertex
-    has been added/removed.
+    has been added/removed.  Other observers (e.g., a rule's edge index) can still subscribe to it.
+
+    Changes made within `with G.batch():` only mark vertices dirty; the adjacency list and canvas are updated once
+    when the outermost batch exits.
     """
-    __slots__ = 'canvas'
+    __slots__ = 'canvas', '_batch_depth', '_dirty'
 
     def __init__(self, canvas, *args, **kwargs):
         self.canvas = canvas
+        self._batch_depth = 0
+        self._dirty = set()  # Vertices whose adjacency list items need new text
         super().__init__(*args, **kwargs)
 
+    @contextmanager
+    def batch(self):
+        """Collect canvas and adjacency list updates until the outermost batch exits.  Batches may be nested."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+
+    def flush(self):
+        """Update the adjacency list rows of dirty vertices and redraw the canvas."""
+        dirty, self._dirty = self._dirty, set()
+        self.canvas.update_adjacency_list(dirty)
+        self.canvas.redraw_layers()
+
+    def _changed(self, *vertices):
+        self._dirty.update(vertices)
+        if not self._batch_depth:
+            self.flush()
+
     def add_vertex(self, *args, **kwargs):
         node = super().add_vertex(*args, **kwargs)
 
-        with self.canvas._node_instructions:
-            self.canvas.nodes[node] = Node(node, self.canvas)
-
-        self.vp.pos[node][:] = random(), random()
+        self.vp.pos[node][:] = self.canvas.random.random(), self.canvas.random.random()
 
-        self.canvas.nodes[node].make_list_item(self.canvas.adjacency_list)
+        self.canvas.topology_changed(vertices=True)
+        self._changed()
 
         return node
 
     def remove_vertex(self, node, fast=True):
-        for edge in set(node.all_edges()):
-            self.remove_edge(edge)
-
-        instruction = self.canvas.nodes[node]
         canvas = self.canvas
-        #
-        # --- Remove the canvas instructions corresponding to node. Prepare last node to take its place. ---
-        #
-        if canvas.highlighted is instruction:
-            canvas.highlighted = None
-
-        if instruction in canvas._pinned:
-            canvas._pinned.remove(instruction)
-        elif instruction in canvas._selected:
-            canvas._selected.remove(instruction)
-
-        last = self.num_vertices() - 1
         pos = int(node)
-        if pos != last:
-            last_vertex = self.vertex(last)
-            last_node = canvas.nodes.pop(last_vertex)
-            edge_instructions = tuple(canvas.edges.pop(edge) for edge in set(last_vertex.all_edges()))
-        else:
-            last_vertex = None
-
-        canvas.adjacency_list.remove_widget(canvas.nodes[node].list_item)
-        canvas._node_instructions.remove_group(instruction.group_name)
-        del canvas.nodes[node]
-        #
-        # --- Prep done.
-        #
-
-        super().remove_vertex(node, fast=True)  # Interface relies on fast=True, we ignore the previous fast value
-
-        #
-        # --- Swap the vertex descriptor of the last node and edge descriptors of all edges adjacent to ---
-        # --- it and fix our node and edge dictionary that used these descriptors. (Node deletion       ---
-        # --- invalidated these descriptors.)                                                           ---
-        #
-        if last_vertex is None:
-            return
-
-        last_node.vertex = self.vertex(pos)         # Update descriptor
-        canvas.nodes[last_node.vertex] = last_node  # Update node dict
-
-        for edge_instruction, edge in zip(edge_instructions, set(last_node.vertex.all_edges())):
-            edge_instruction.s, edge_instruction.t = edge  # Update descriptor
-            canvas.edges[edge] = edge_instruction          # Update edge dict
-
-        canvas.adjacency_list.remove_widget(last_node.list_item)
-        last_node.list_item.update_text()
-        canvas.adjacency_list.add_widget(last_node.list_item, index=self.num_vertices() - pos - 1)
+        last = self.num_vertices() - 1
+
+        if canvas.highlighted == pos:
+            canvas.highlighted = None
+        if canvas.source == pos:
+            canvas.source = None
+
+        with self.batch():  # One flush for all of node's edges
+            # Removes node's edges first, then moves the last vertex into node's index.  Node states are vertex
+            # property maps, so they're moved along with the last vertex.
+            super().remove_vertex(node)
+            canvas.topology_changed(vertices=True)  # Edges of the last node now have a new source or target.
+
+            # The adjacency list shrinks by a row when the batch is flushed.
+            self._dirty.discard(pos)
+            if pos != last:
+                # The last vertex now has index pos: fix everything that refers to it by index.
+                if canvas.highlighted == last:
+                    canvas._highlighted = pos
+                if canvas.source == last:
+                    canvas._source = pos
+
+                self._dirty.discard(last)
+                self._dirty.add(pos)
 
     def add_edge(self, *args, **kwargs):
         edge = super().add_edge(*args, **kwargs)
+        source, target = int(edge.source()), int(edge.target())
 
-        # Make a new canvas instruction corresponding to edge.
-        with self.canvas._edge_instructions:
-            self.canvas.edges[edge] = Edge(edge, self.canvas)
-        self.canvas.nodes[self.canvas.edges[edge].s].list_item.update_text()
-        self.canvas.update_canvas()
+        self.canvas.topology_changed(mutated=(source, target))
+        self._changed(source)
 
         return edge
 
-    def remove_edge(self, edge):
-        # Remove canvas instruction corresponding to edge
-        source = edge.source()
-        instruction = self.canvas.edges.pop(edge)
-        self.canvas._edge_instructions.remove_group(instruction.group_name)
+    def add_edge_list(self, edge_list, *args, **kwargs):
+        super().add_edge_list(edge_list, *args, **kwargs)
+        endpoints = np.asarray(edge_list)[:, :2].astype(np.int64)
+
+        self.canvas.topology_changed(mutated=np.unique(endpoints).tolist())
+        self._changed(*np.unique(endpoints[:, 0]).tolist())
+
+    def remove_edge_list(self, edge_list):
+        endpoints = np.asarray(edge_list)[:, :2].astype(np.int64)
+        super().remove_edge_list(endpoints)
 
+        self.canvas.topology_changed(mutated=np.unique(endpoints).tolist())
+        self._changed(*np.unique(endpoints[:, 0]).tolist())
+
+    def remove_edge(self, edge):
+        source, target = int(edge.source()), int(edge.target())
         super().remove_edge(edge)
 
-        self.canvas.nodes[source].list_item.update_text()
-        self.canvas.update_canvas()
+        self.canvas.topology_changed(mutated=(source, target))
+        self._changed(source)
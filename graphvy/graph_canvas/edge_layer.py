@@ -0,0 +1,96 @@
+"""
+All edges of the graph as lines with arrow heads, computed in a single vectorized pass.
+"""
+import numpy as np
+
+from .mesh_layer import MeshLayer
+from ..constants import EDGE_WIDTH, HEAD_SIZE, LOD
+
+# Arrow head points are: (-0.5, 0), (-4, 1), (-4, -1), in units of HEAD_SIZE along/across the edge:
+#
+#                 |
+#        o        |
+#     ----------o-O---     (O is the edge's target)
+#        o        |
+#                 |
+#
+# Tip is off the target so that the arrow is less covered by nodes.
+HEAD = np.array([[-0.5, 0], [-4, 1], [-4, -1]], dtype=np.float32)
+
+
+class EdgeLayer(MeshLayer):
+    """
+    Each edge is a quad (the line) followed by a triangle (the arrow head): 7 vertices, 3 triangles.  Edges shorter
+    than `min_head_length` pixels (other than self-loops) get an empty head: it would only cover the edge.
+    """
+    vertices_per_item = 7
+    item_indices = 0, 1, 2, 0, 2, 3, 4, 5, 6
+
+    def __init__(self, width=EDGE_WIDTH, head_size=HEAD_SIZE, directed=True, min_head_length=LOD['min_head_length']):
+        super().__init__()
+        self.width = width
+        self.head = HEAD * head_size
+        self.directed = directed
+        self.min_head_length = min_head_length
+
+    def resize_head(self, size):
+        self.head = HEAD * size
+
+    def update(self, coords, edges, colors, rows=None):
+        """
+        Recompute all edges.  `coords` is the (V, 2) array of canvas coordinates of the nodes, `edges` is an
+        (E, 2) array of source and target indices and `colors` is an (E, 4) array of rgba values.
+
+        If `rows` (an array of edge rows) is given, only those edges are recomputed and `edges` and `colors` are
+        only theirs.
+        """
+        if rows is not None:
+            vertices = self.vertices[rows]
+            self._compute(vertices, coords, edges, colors)
+            self.vertices[rows] = vertices
+            return self.upload_items(rows)
+
+        self.resize(len(edges))
+        if not len(edges):
+            return
+
+        self._compute(self.vertices[:len(edges)], coords, edges, colors)
+        self.upload()
+
+    def _compute(self, vertices, coords, edges, colors):
+        """Fill `vertices` (an (E, 7, VERTEX_SIZE) array) with the quads and heads of `edges`."""
+        sources = coords[edges[:, 0]]
+        targets = coords[edges[:, 1]]
+
+        direction = targets - sources
+        lengths = np.hypot(direction[:, 0], direction[:, 1])[:, None]
+        np.divide(direction, lengths, out=direction, where=lengths != 0)
+        direction[lengths[:, 0] == 0] = 1, 0  # Self-loops point right so the head has some orientation.
+
+        normal = np.empty_like(direction)
+        normal[:, 0] = -direction[:, 1]
+        normal[:, 1] = direction[:, 0]
+
+        offset = normal * self.width
+        vertices[:, 0, :2] = sources + offset
+        vertices[:, 1, :2] = sources - offset
+        vertices[:, 2, :2] = targets - offset
+        vertices[:, 3, :2] = targets + offset
+
+        # Rotate the head so it points along the edge.
+        heads = (lengths[:, 0] >= self.min_head_length) | (lengths[:, 0] == 0)
+        if heads.all():
+            heads = slice(None)
+        else:
+            vertices[:, 4:, :2] = targets[:, None]  # Empty heads
+            targets, direction, normal = targets[heads], direction[heads], normal[heads]
+
+        vertices[heads, 4:, :2] = (targets[:, None]
+                                   + self.head[:, 0, None] * direction[:, None]
+                                   + self.head[:, 1, None] * normal[:, None])
+
+        vertices[:, :4, 4:] = colors[:, None]
+        head_colors = np.minimum(colors * 1.2, 1)
+        if not self.directed:
+            head_colors[:, 3] = 0
+        vertices[:, 4:, 4:] = head_colors[:, None]
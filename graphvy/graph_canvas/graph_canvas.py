@@ -4,42 +4,40 @@ Space to pause/unpause the layout algorithm. Ctrl-Space to pause/unpause the Gra
 """
 from functools import wraps
 from math import hypot
-from random import random
+import os
+from threading import Thread
 import time
 
-from kivy.clock import Clock
+from kivy.clock import Clock, mainthread
 from kivy.graphics import Color, Ellipse, Line, Rectangle
 from kivy.config import Config
-from kivy.graphics.instructions import CanvasBase
-from kivy.properties import OptionProperty, ObjectProperty
+from kivy.logger import Logger
+from kivy.properties import BooleanProperty, NumericProperty, OptionProperty, ObjectProperty, StringProperty
 from kivy.uix.layout import Layout
 from kivy.uix.widget import Widget
 from kivy.core.window import Window
 from kivymd.app import MDApp
 
 import graph_tool as gt
-from graph_tool.draw import random_layout, sfdp_layout
 import numpy as np
 
-from .convenience_classes import Node, Edge, Selection, SelectedSet, PinnedSet, GraphInterface
-from .colormap import get_colormap
+from .convenience_classes import GraphInterface, ProgressReader, Selection
+from .colormap import colors_from, get_colormap
+from .edge_layer import EdgeLayer
+from .layout_worker import LayoutWorker
+from .node_layer import NodeLayer
+from .playback import Player
+from .profiler import Profiler, ProfilerHUD, profiled
+from .spatial_index import GridIndex
 from ..constants import *
+from ..random_graphs import erdos_random_graph
+from ..random_stream import RandomStream
+from ..recording import Recorder, Recording
+from ..run import start_rule
 
 Config.set('input', 'mouse', 'mouse,multitouch_on_demand')
 
 
-def erdos_random_graph(nodes, edges, prune=True):
-    G = gt.Graph()
-    G.add_vertex(nodes)
-    for _ in range(edges):
-        G.add_edge(0, 0)
-    gt.generation.random_rewire(G, model='erdos')
-
-    if prune:
-        G = gt.topology.extract_largest_component(G, directed=False, prune=True)
-    return G
-
-
 def redraw_canvas_after(func):
     """For methods that change vertex coordinates."""
     @wraps(func)
@@ -73,25 +71,44 @@ class GraphCanvas(Widget):
     Dynamic graph layout widget.  Layout updates as graph changes.
 
     rule(G) should return a callable that updates G when called.
+
+    Random draws of the canvas (new vertices' positions, random graphs and the seeds of rules) are from
+    `self.random`, a RandomStream seeded with `seed`, so that runs can be reproduced.
     """
     tool = OptionProperty("Grab", options=TOOLS)
     adjacency_list = ObjectProperty(None)
 
-    _mouse_pos_disabled = False
+    # While load_graph_async reads or generates a graph:
+    loading = BooleanProperty(False)
+    load_status = StringProperty()
+    load_progress = NumericProperty(0)  # from 0 to 1
 
-    _selected = SelectedSet()
-    _pinned = PinnedSet()
+    _mouse_pos_disabled = False
 
     _touches = []
+    _drag_selection = None  # Sorted vertices selected by the current drag-select; see on_drag_select
 
     _callback_paused = True
     _layout_paused = False
+    _layout_idle = False  # The layout converged and is stepped every CONVERGENCE['idle_interval'] seconds, if at all.
+
+    # Each frame the rule is stepped for rule_budget seconds, or exactly rule_steps times if it's set.
+    rule_budget = RULE_BUDGET
+    rule_steps = RULE_STEPS
+    steps_per_second = 0  # Achieved rule steps per second, smoothed over recent frames
+
+    # Incremented whenever vertices (or edges) are added or removed; tells the layout worker what it's laying out.
+    _vertex_generation = 0
+    _edge_generation = 0
 
     delay = .3
 
     console = None
 
-    def __init__(self, *args, G=None, rule=None, multigraph=False, **kwargs):
+    recorder = None  # Records G's changes while set; see start_recording
+    player = None    # Plays a recording while set; see play_recording
+
+    def __init__(self, *args, G=None, rule=None, multigraph=False, seed=None, **kwargs):
         self.touch_down_dict = {'Grab': lambda touch=None: None,
                                 'Select': self.select_touch_down,
                                 'Pin': self.pin_touch_down,
@@ -101,9 +118,15 @@ class GraphCanvas(Widget):
                                 'Add Edge': self.add_edge_touch_down,
                                 'Delete Edge': self.delete_edge_touch_down}
 
+        self.profiler = Profiler(self)
+        self.random = RandomStream(seed)
+
         super().__init__(*args, **kwargs)
 
+        self.hud = ProfilerHUD(self, self.profiler)
         self.resize_event = Clock.schedule_once(lambda dt: None, 0)  # Dummy event to save a conditional
+        self._redraw_trigger = Clock.create_trigger(self.redraw_dirty)  # Coalesces redraws to once per frame
+        self.layout_worker = LayoutWorker()
         self.load_graph(G)  # Several attributes set/reset here
 
         self.bind(size=self._delayed_resize, pos=self._delayed_resize,
@@ -117,6 +140,8 @@ class GraphCanvas(Widget):
         self.multigraph = multigraph
 
     def load_graph(self, G=None, random=(50, 80)):
+        self.stop_recording()  # A recording is of a single graph.
+
         # Halt layout and graph_rule
         if (layout_needs_unpause := hasattr(self, 'update_layout') and not self._layout_paused):
             self.pause_layout()
@@ -124,29 +149,46 @@ class GraphCanvas(Widget):
             self.pause_callback()
 
         # Setup interface
-        none_attrs = ['_highlighted', 'edges', 'nodes', 'background_color', '_background', 'select_rect',
-                      '_edge_instructions', '_node_instructions', '_source_color', '_source_circle', 'coords',
-                      '_source', 'rule_callback']
+        none_attrs = ['_highlighted', 'edge_layer', 'edge_array', 'node_layer', 'background_color', '_background',
+                      'select_rect', '_source_color', '_source_circle', 'coords', '_source', 'rule_callback',
+                      '_edge_rows', '_drawn_nodes', '_drawn_edges', '_drawn_ends', '_drawn_visible']
         self.__dict__.update(dict.fromkeys(none_attrs))
+        self._dirty_vertices = set()  # Vertices (and their edges) to redraw next frame
+        self._mutated = set()  # Vertices whose edges changed since the last layout step
+        self._moved_vertices = None  # Arrays of vertices moved since the spatial index was updated, None if unknown
+        self._redraw_all = False
+        self.spatial_index = GridIndex()
+        self.topology_changed(vertices=True)
 
         self.offset_x = .25
         self.offset_y = .25
         self.scale = .5
 
         if G is None:
-            self.G = GraphInterface(self, erdos_random_graph(*random)) if random else GraphInterface(self)
+            self.G = (GraphInterface(self, erdos_random_graph(*random, rng=self.random.seed())) if random
+                      else GraphInterface(self))
         elif isinstance(G, str):
             self.G = GraphInterface(self, gt.load_graph(G, fmt='gt'))
+        elif isinstance(G, GraphInterface) and G.canvas is self:
+            self.G = G  # Made for this canvas (by load_graph_async), no need to copy it.
         else:
             self.G = GraphInterface(self, G)
         self.G.set_fast_edge_removal()
+        self.layout_worker.reset()
+        self.G.subscribe(self.layout_worker)  # So it can renumber positions computed before vertices were removed
         if self.console is not None:
             self.console.console.locals['G'] = self.G
 
         if 'pos' not in self.G.vp:
-            self.G.vp.pos = random_layout(self.G, (1, 1))
-        self.G.vp.pinned = self.G.new_vertex_property('bool')
+            positions = self.random.rng.random((2, self.G.num_vertices()))
+            self.G.vp.pos = gt.group_vector_property([self.G.new_vertex_property('double', vals=coordinate)
+                                                      for coordinate in positions])
+        self.G.vp.pinned = self.G.new_vertex_property('bool')  # Pinned nodes are ignored by the layout.
 
+        # Node states drawn over the node colormap.  These are property maps (rather than sets of vertices) so
+        # that they stay correct when vertices are removed and so that they can be applied to whole arrays.
+        self._selected = self.G.new_vertex_property('bool')
+        self._pinned = self.G.new_vertex_property('bool')
 
         self.set_node_colormap(update=False)
         self.set_edge_colormap(update=False)
@@ -164,13 +206,65 @@ class GraphCanvas(Widget):
             if callback_needs_unpause:
                 self.pause_callback()
 
+    def load_graph_async(self, G=None, random=(50, 80), on_error=None):
+        """
+        Like load_graph, but the file is read (or the random graph generated) in a background thread while the
+        current graph stays up and the progress is shown.  Only the final, vectorized setup blocks the UI.  If
+        loading fails, on_error(exception) is called (by default, the error is logged).
+        """
+        if self.loading:
+            return
+
+        self.loading = True
+        self.load_progress = 0
+        self.load_status = (f'Reading {os.path.basename(G)}' if isinstance(G, str)
+                            else 'Generating random graph' if G is None and random else 'Loading graph')
+        Thread(target=self._load_in_background, args=(G, random, self.random.seed(), on_error),
+               daemon=True).start()
+
+    def _load_in_background(self, G, random, seed, on_error):
+        try:
+            if isinstance(G, str):
+                graph = GraphInterface(self)
+                with open(G, 'rb') as file:
+                    graph.load(ProgressReader(file, self._set_load_progress), fmt='gt')
+            elif G is None:
+                graph = (GraphInterface(self, erdos_random_graph(*random, rng=seed)) if random
+                         else GraphInterface(self))
+            else:
+                graph = GraphInterface(self, G)
+        except Exception as error:
+            self._finish_loading(None, error, on_error)
+        else:
+            self._finish_loading(graph, None, on_error)
+
+    @mainthread
+    def _set_load_progress(self, fraction):
+        self.load_progress = fraction
+
+    @mainthread
+    def _finish_loading(self, G, error, on_error):
+        self.loading = False
+        if error is None:
+            self.load_graph(G=G)
+        elif on_error is not None:
+            on_error(error)
+        else:
+            Logger.error(f'Graphvy: failed to load graph: {error!r}')
+
     def populate_adjacency_list(self, *args):
         if self.adjacency_list is None:
             return
 
-        self.adjacency_list.clear_widgets()
-        for node in self.nodes.values():
-            node.make_list_item(self.adjacency_list)
+        self.adjacency_list.graph_canvas = self
+        self.adjacency_list.resize(self.G.num_vertices())
+        self.adjacency_list.refresh_from_data()
+
+    def update_adjacency_list(self, vertices=()):
+        """Match the adjacency list's length to G and re-render the rows of the given vertices."""
+        if self.adjacency_list is not None:
+            self.adjacency_list.resize(self.G.num_vertices())
+            self.adjacency_list.refresh_rows(vertices)
 
     def set_node_colormap(self, property_=None, states=1, end=None, update=True):
         if property_ is None:
@@ -200,56 +294,106 @@ class GraphCanvas(Widget):
         if not self._callback_paused:
             self.pause_callback()
 
-        self.rule_callback = rule(self.G)
+        if (close := getattr(self.rule_callback, 'close', None)) is not None:
+            close()  # Old rule stops observing G.
+        self.rule_callback = start_rule(rule, self.G, self.random.seed())
         self.update_graph = Clock.schedule_interval(self.callback, 0)
         self.update_graph.cancel()
 
-    def previous_state(self, node):
-        """Return a highlighted node to its previous state."""
-        if node in self._selected:
-            node.freeze(SELECTED_COLOR)
-        elif node in self._pinned:
-            node.freeze(PINNED_COLOR)
+    def node_state_changed(self, vertex):
+        """
+        Pin a vertex (so the layout ignores it) if it's highlighted, selected or pinned and recolor it.  The layout
+        isn't woken: a vertex that's unpinned where the layout left it is already laid out.
+        """
+        self.G.vp.pinned[vertex] = (self._selected[vertex] or self._pinned[vertex]
+                                    or vertex == self.highlighted or vertex == self.source)
+        self.update_adjacency_list((vertex,))
+        self.redraw((vertex,))
+
+    def refresh_pins(self, vertices=None):
+        """Vectorized node_state_changed for the given vertices, or for every vertex if vertices is None."""
+        pinned = self.G.vp.pinned.a
+        if vertices is None:
+            np.logical_or(self._selected.a, self._pinned.a, out=pinned, casting='unsafe')
         else:
-            node.unfreeze()
-
-    @redraw_canvas_after
+            vertices = np.asarray(vertices, dtype=np.int64)
+            pinned[vertices] = self._selected.a[vertices] | self._pinned.a[vertices]
+        for vertex in (self.highlighted, self.source):
+            if vertex is not None:
+                pinned[vertex] = 1
+        self.redraw(None if vertices is None else vertices.tolist())
+
+    def list_item_color(self, vertex):
+        """Same precedence as update_nodes: source, highlighted, pinned, selected."""
+        if vertex == self.source or vertex == self.highlighted:
+            return HIGHLIGHTED_NODE
+        if self._pinned[vertex]:
+            return PINNED_COLOR
+        if self._selected[vertex]:
+            return ALT_SELECTED_COLOR
+        return SELECTED_COLOR
+
+    @profiled('callback')
     def callback(self, dt):
-        self.rule_callback()
+        """
+        Step the rule as many times as fit in this frame's budget; the canvas is redrawn once afterwards, when G's
+        batch flushes.
+        """
+        rule_callback = self.rule_callback
+        if self.recorder is not None:
+            rule_callback = self.recorder.recording(rule_callback)
+        steps = 0
+
+        with self.G.batch():
+            if self.rule_steps:
+                for steps in range(1, self.rule_steps + 1):
+                    rule_callback()
+            else:
+                end = time.perf_counter() + self.rule_budget
+                while True:
+                    rule_callback()
+                    steps += 1
+                    if time.perf_counter() >= end:
+                        break
+
+        if self.recorder is not None:
+            self.recorder.flush()
+
+        if dt:
+            self.steps_per_second += .1 * (steps / dt - self.steps_per_second)
 
     @property
     def highlighted(self):
         return self._highlighted
 
     @highlighted.setter
-    def highlighted(self, node):
-        """Freezes highlighted nodes or returns un-highlighted nodes to the proper color."""
+    def highlighted(self, vertex):
+        """Pins highlighted nodes or returns un-highlighted nodes to their previous state."""
         lit = self.highlighted
-        if lit is not None and lit is not self.source:
-            self.previous_state(lit)
+        self._highlighted = vertex
 
-        if node is not None:
-            node.freeze(HIGHLIGHTED_NODE)
-
-        self._highlighted = node
+        if lit is not None and lit != vertex:
+            self.node_state_changed(lit)
+        if vertex is not None:
+            self.node_state_changed(vertex)
 
     @property
     def source(self):
         return self._source
 
     @source.setter
-    def source(self, node):
+    def source(self, vertex):
         source = self.source
+        self._source = vertex
+
         if source is not None:
             self._source_color.a = 0
-            self.previous_state(source)
+            self.node_state_changed(source)
 
-        if node is not None:
-            node.freeze(HIGHLIGHTED_NODE)
-            self._source_circle.circle = *self.coords[int(node.vertex)], SOURCE_RADIUS
+        if vertex is not None:
+            self._source_circle.circle = *self.coords[vertex], SOURCE_RADIUS
             self._source_color.a = 1
-
-        self._source = node
+            self.node_state_changed(vertex)
 
     def _delayed_resize(self, *args):
         self.resize_event.cancel()
@@ -264,14 +408,78 @@ class GraphCanvas(Widget):
         self._layout_paused = not self._layout_paused
         if self._layout_paused:
             self.update_layout.cancel()
+        elif self._layout_idle:
+            self.wake_layout()
         else:
             self.update_layout()
 
+    def idle_layout(self):
+        """The layout converged: step it every CONVERGENCE['idle_interval'] seconds, or not at all, until woken."""
+        self._layout_idle = True
+        self.update_layout.cancel()
+        if (interval := CONVERGENCE['idle_interval']) is not None:
+            self.update_layout = Clock.schedule_interval(self.step_layout, interval)
+
+    def wake_layout(self):
+        """The graph changed, a node was dragged or (un)pinned: step the layout every frame again until it converges."""
+        if not hasattr(self, 'layout_worker'):
+            return  # Still initializing
+        self.layout_worker.wake()
+
+        if not self._layout_idle:
+            return
+        self._layout_idle = False
+        self.update_layout.cancel()
+        self.update_layout = Clock.schedule_interval(self.step_layout, UPDATE_INTERVAL)
+        if self._layout_paused:
+            self.update_layout.cancel()
+
+    @property
+    def layout_state(self):
+        return 'paused' if self._layout_paused else 'idle' if self._layout_idle else 'running'
+
+    def set_layout_engine(self, engine):
+        """Lay out the graph with `engine`, a LayoutEngine (e.g., BarnesHutEngine()), from the next layout step on."""
+        engine.reset()
+        self.layout_worker.engine = engine
+
+    def toggle_local_layout(self):
+        """Switch between laying out the whole graph every step and mostly laying out only what changed."""
+        self.layout_worker.local = not self.layout_worker.local
+
+    def start_recording(self, path, **kwargs):
+        """Record every change to G, step by step, to the directory `path`.  kwargs are passed to Recorder."""
+        self.stop_recording()
+        self.recorder = Recorder(self.G, path, **kwargs)
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def play_recording(self, path):
+        """Replace G with the recording at the directory `path`, at its first step; `player` controls playback."""
+        self.stop_playback()
+        self.stop_recording()
+        if not self._callback_paused:
+            self.pause_callback()
+        self.player = Player(self, Recording(path))
+
+    def stop_playback(self):
+        """Leave G as it is at the current step of the recording."""
+        if self.player is not None:
+            self.player.close()
+            self.player = None
+
     def pause_callback(self):
+        if self.player is not None:
+            return  # The recording, not the rule, changes G during playback.
+
         self._callback_paused = not self._callback_paused
         if self.rule_callback is not None:
             if self._callback_paused:
                 self.update_graph.cancel()
+                self.steps_per_second = 0
             else:
                 self.update_graph()
 
@@ -283,22 +491,21 @@ class GraphCanvas(Widget):
             self.background_color = Color(*BACKGROUND_COLOR)
             self._background = Rectangle(size=self.size, pos=self.pos)
 
-        self._edge_instructions = CanvasBase()
-        with self._edge_instructions:
-            self.edges = {edge: Edge(edge, self) for edge in self.G.edges()}
-        self.canvas.add(self._edge_instructions)
+        self.edge_layer = EdgeLayer()
+        self.canvas.add(self.edge_layer.render_context)
 
-        self._node_instructions = CanvasBase()
-        with self._node_instructions:
+        with self.canvas:
             self._source_color = Color(*SOURCE_COLOR)
             self._source_circle = Line(width=SOURCE_WIDTH)
-            self.nodes = {vertex: Node(vertex, self) for vertex in self.G.vertices()}
-        self.canvas.add(self._node_instructions)
+
+        self.node_layer = NodeLayer()
+        self.canvas.add(self.node_layer.render_context)
 
         with self.canvas.after:
             self.select_rect = Selection()
             Color(1, 1, 1, 1)
 
+    @profiled('update_canvas')
     @limit(UPDATE_INTERVAL)
     def update_canvas(self, dt=None):  # dt for use by kivy Clock
         """Update node coordinates and edge colors."""
@@ -309,17 +516,256 @@ class GraphCanvas(Widget):
         self._background.pos = self.pos
 
         self.transform_coords()
+        self.update_layers()
 
-        for node in self.nodes.values():
-            node.update()
+    def redraw(self, vertices=None):
+        """
+        Redraw the given vertices and their edges (or everything, if vertices is None) at the end of the frame.
+        Vertices that moved must have their coordinates updated in self.coords.
+        """
+        if vertices is None:
+            self._redraw_all = True
+        else:
+            self._dirty_vertices.update(vertices)
+        self._redraw_trigger()
 
-        for edge in self.edges.values():
-            edge.update()
+    def redraw_layers(self):
+        """Redraw everything at the end of the frame, e.g., after the topology or colormap changed."""
+        self.redraw()
 
-    @redraw_canvas_after
+    @profiled('redraw_dirty')
+    def redraw_dirty(self, dt=None):
+        """
+        Recompute only the dirty vertices and their edges, unless too much changed or what level_of_detail selects
+        may have changed: then the layers are recomputed in full.
+        """
+        if self.coords is None or not (self._redraw_all or self._dirty_vertices):
+            return
+
+        vertices = np.fromiter(self._dirty_vertices, dtype=np.int64, count=len(self._dirty_vertices))
+        if (self._redraw_all or len(vertices) > PARTIAL_REDRAW_FRACTION * self.G.num_vertices()
+            or self._drawn_nodes is not None and not self._selected_as_drawn(vertices)):
+            if not self.resize_event.is_triggered:
+                self.transform_coords()
+            return self.update_layers()
+
+        self._dirty_vertices.clear()
+        self.update_nodes(vertices)
+        self.update_edges(self.incident_edge_slots(vertices))
+
+    def _selected_as_drawn(self, vertices):
+        """
+        Whether level_of_detail would still select the given vertices as the layers draw them: none of them moved
+        onto or off the canvas and none of them that aren't drawn are pinned (e.g., just highlighted or selected).
+        """
+        if not (self._drawn_visible[vertices].all() and self.on_canvas(self.coords[vertices]).all()):
+            return False
+        _, drawn = self._node_slots(vertices)
+        return not self.G.vp.pinned.a[vertices[~drawn]].any()
+
+    def _node_slots(self, vertices):
+        """Slots of the node layer of the given vertices and whether each is drawn, while a subset is drawn."""
+        slots = np.searchsorted(self._drawn_nodes, vertices)
+        drawn = slots < len(self._drawn_nodes)
+        drawn[drawn] = self._drawn_nodes[slots[drawn]] == vertices[drawn]
+        return slots, drawn
+
+    @profiled('update_layers')
+    def update_layers(self, dt=None):
+        """Recompute the node and edge layers from self.coords, drawing only what level_of_detail selects."""
+        self._redraw_all = False
+        self._dirty_vertices.clear()
+
+        if self.coords is None:
+            return
+
+        self._drawn_nodes, self._drawn_edges, self._drawn_ends, self._drawn_visible = self.level_of_detail()
+
+        # Rings of nodes packed closer than LOD['min_ring_spacing'] blur together; discs read better.
+        drawn = len(self.coords) if self._drawn_nodes is None else len(self._drawn_nodes)
+        self.node_layer.rings = self.width * self.height >= drawn * LOD['min_ring_spacing'] ** 2
+
+        self.update_nodes()
+        self.update_edges()
+
+    def on_canvas(self, coords):
+        """Whether each of the (n, 2) canvas coordinates is within LOD['margin'] of the canvas."""
+        margin = LOD['margin']
+        return np.all((-margin <= coords) & (coords <= np.array((self.width, self.height)) + margin), axis=1)
+
+    def level_of_detail(self):
+        """
+        Select what to draw: nodes within LOD['margin'] of the canvas and edges whose bounding boxes overlap it.  If
+        more nodes are visible than there are LOD['cell'] sized cells on the canvas, only one node per cell is drawn
+        (pinned nodes are always drawn) and edges are drawn once between the cells' nodes.
+
+        Returns the vertices to draw (sorted), the rows of the edge array to draw, their (n, 2) endpoints and whether
+        each vertex is visible, or Nones if everything is drawn as is.
+        """
+        coords = self.coords
+        margin = LOD['margin']
+        low, high = -margin, np.array((self.width, self.height)) + margin
+
+        visible = self.on_canvas(coords)
+        vertices = np.flatnonzero(visible)
+
+        cell = LOD['cell']
+        shape = (int(high[0] - low) // cell + 1, int(high[1] - low) // cell + 1)
+        aggregate = len(vertices) > shape[0] * shape[1]
+        if len(vertices) == len(coords) and not aggregate:
+            return None, None, None, None
+
+        edges = self.get_edge_array()
+        sources, targets = coords[edges[:, 0]], coords[edges[:, 1]]
+        rows = np.flatnonzero(np.all((np.minimum(sources, targets) <= high)
+                                     & (np.maximum(sources, targets) >= low), axis=1))
+        ends = edges[rows, :2]
+
+        if aggregate:
+            # Each visible vertex is drawn as the first visible vertex in its cell, except pinned ones.
+            cells = ((coords[vertices] - low) // cell).astype(np.int64)
+            cells = cells[:, 0] * shape[1] + cells[:, 1]
+            first = np.empty(shape[0] * shape[1], dtype=np.int64)
+            first[cells[::-1]] = vertices[::-1]  # Of repeated indices, the last assignment sticks.
+            representative = np.arange(len(coords))
+            representative[vertices] = first[cells]
+
+            pinned = np.flatnonzero(self.G.vp.pinned.a)
+            representative[pinned] = pinned
+            vertices = np.union1d(np.unique(first[cells]), pinned[visible[pinned]])
+
+            # One edge per pair of cells (or off-canvas vertices); none within a cell.
+            ends = representative[ends]
+            keep = ends[:, 0] != ends[:, 1]
+            rows, ends = rows[keep], ends[keep]
+            _, first = np.unique(ends[:, 0] * len(coords) + ends[:, 1], return_index=True)
+            rows, ends = rows[first], ends[first]
+
+        return vertices, rows, ends, visible
+
+    def update_nodes(self, vertices=None):
+        """
+        Recompute the given nodes (default: all that are drawn) of the node layer from self.coords.  Node states are
+        drawn over the colormap.  Of the given nodes, those level_of_detail didn't select are skipped.
+        """
+        if self.coords is None:
+            return
+
+        slots = vertices  # Of the node layer
+        if self._drawn_nodes is None:
+            index = slice(None) if vertices is None else vertices
+        elif vertices is None:
+            index = self._drawn_nodes
+        else:
+            slots, drawn = self._node_slots(vertices)
+            index, slots = vertices[drawn], slots[drawn]
+        colors = colors_from(self.node_colormap, self.node_colors.a[index])
+
+        def rows_of(vertex):
+            return vertex if isinstance(index, slice) else index == vertex
+
+        colors[self._selected.a[index].astype(bool)] = SELECTED_COLOR
+        colors[self._pinned.a[index].astype(bool)] = PINNED_COLOR
+        if self.highlighted is not None:  # Hovering shows over selected and pinned nodes too.
+            colors[rows_of(self.highlighted)] = HIGHLIGHTED_NODE
+        if self.source is not None:
+            colors[rows_of(self.source)] = HIGHLIGHTED_NODE
+            self._source_circle.circle = *self.coords[self.source], SOURCE_RADIUS
+
+        if vertices is None and self._drawn_nodes is not None:
+            return self.node_layer.update(self.coords[index], colors)
+        self.node_layer.update(self.coords, colors, index, slots)
+
+    def update_edges(self, slots=None):
+        """
+        Recompute the given slots (default: all) of the edge layer from self.coords.  The edge layer draws the rows
+        of the edge array that level_of_detail selects, or every row in order if it selects everything.
+        """
+        if self.coords is None:
+            return
+
+        edges = self.get_edge_array()
+        ends = self._drawn_ends
+        if self._drawn_edges is None:
+            rows = slots
+        elif slots is None:
+            rows = self._drawn_edges
+        else:
+            rows, ends = self._drawn_edges[slots], ends[slots]
+
+        if rows is not None:
+            edges = edges[rows]
+        if ends is None:
+            ends = edges[:, :2]
+
+        sources, targets, indices = edges.T
+        colors = colors_from(self.edge_colormap, self.edge_colors.a[indices])
+        colors[self.G.vp.pinned.a[sources].astype(bool)] = HIGHLIGHTED_EDGE
+
+        self.edge_layer.update(self.coords, ends, colors, slots)
+
+    def get_edge_array(self):
+        """(E, 3) array of sources, targets and edge indices; the edge layer draws edges in this order."""
+        if self.edge_array is None:
+            self.edge_array = self.G.get_edges([self.G.edge_index])
+            self._edge_rows = np.zeros(self.G.edge_index_range, dtype=np.int64)  # Edge index -> row
+            self._edge_rows[self.edge_array[:, 2]] = np.arange(len(self.edge_array))
+        return self.edge_array
+
+    def incident_edge_rows(self, vertices):
+        """Rows of the edge array of all edges into or out of `vertices`."""
+        self.get_edge_array()
+        edge_index = [self.G.edge_index]
+        indices = [self.G.get_all_edges(vertex, edge_index)[:, 2] for vertex in vertices.tolist()]
+        if not indices:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(self._edge_rows[np.concatenate(indices)])
+
+    def incident_edge_slots(self, vertices):
+        """Slots of the edge layer of all drawn edges into or out of `vertices`."""
+        if self._drawn_edges is None:
+            return self.incident_edge_rows(vertices)
+        return np.flatnonzero(np.isin(self._drawn_ends, vertices).any(axis=1))
+
+    def topology_changed(self, vertices=False, mutated=()):
+        """
+        Called by GraphInterface when edges (or vertices, if `vertices` is True) are added or removed.  `mutated`
+        are the endpoints of changed edges; the local layout relaxes their neighbourhoods.
+        """
+        self.edge_array = None  # Edge layer will rebuild its edge array on next update.
+        self._mutated.update(mutated)
+        self._edge_generation += 1
+        if vertices:
+            self._vertex_generation += 1
+            self._moved_vertices = None  # Vertices were renumbered.
+        self.wake_layout()
+
+    @profiled('step_layout')
     def step_layout(self, dt):
-        sfdp_layout(self.G, pos=self.G.vp.pos, pin=self.G.vp.pinned, **SFDP_SETTINGS)
+        """
+        Swap in the newest positions from the layout worker (except for pinned nodes, which the user may be dragging)
+        and post the current graph for its next step.  Idles the layout once it has converged.
+        """
+        pos = self.G.vp.pos.get_2d_array((0, 1))
+        pinned = self.G.vp.pinned.a.astype(bool)
+
+        if (result := self.layout_worker.take(self.G.num_vertices())) is not None:
+            positions, known = result
+            update = known & ~pinned
+            pos[:, update] = positions[:, update]
+            self.G.vp.pos.set_2d_array(pos)
+            if self._moved_vertices is not None:
+                self._moved_vertices.append(np.flatnonzero(update))
+            self.update_canvas()
+
+        self.layout_worker.post(self._vertex_generation, self._edge_generation, self.get_edge_array()[:, :2], pos,
+                                pinned, self._mutated)
+        self._mutated = set()
+
+        if self.layout_worker.converged and not self._layout_idle:
+            self.idle_layout()
 
+    @profiled('transform_coords')
     def transform_coords(self, x=None, y=None):
         """
         Transform vertex coordinates to canvas coordinates.  If no specific coordinate is passed
@@ -330,8 +776,14 @@ class GraphCanvas(Widget):
             return ((x * self.scale + self.offset_x) * self.width,
                     (y * self.scale + self.offset_y) * self.height)
 
-        self.coords = coords = self.G.vp.pos.get_2d_array((0, 1)).T
-        np.multiply(coords, self.scale, out=coords)
+        positions = self.G.vp.pos.get_2d_array((0, 1)).T
+        moved = self._moved_vertices
+        if moved is not None:
+            moved = np.concatenate(moved) if moved else np.zeros(0, dtype=np.int64)
+        self.spatial_index.update(positions, moved)  # Layout coordinates, so panning and zooming don't move them.
+        self._moved_vertices = []
+
+        self.coords = coords = np.multiply(positions, self.scale)
         np.add(coords, (self.offset_x, self.offset_y), out=coords)
         np.multiply(coords, (self.width, self.height), out=coords)
 
@@ -341,32 +793,34 @@ class GraphCanvas(Widget):
         return (x / self.width - off_x) / self.scale, (y / self.height - off_y) / self.scale
 
     def select_touch_down(self, touch=None):
-        if self.highlighted is not None and self.highlighted not in self._pinned:
-            if self.highlighted in self._selected:
-                self._selected.remove(self.highlighted)
-            else:
-                self._selected.add(self.highlighted)
+        self._drag_selection = None
+        lit = self.highlighted
+        if lit is not None and not self._pinned[lit]:
+            self._selected[lit] = not self._selected[lit]
+            self.node_state_changed(lit)
 
     def pin_touch_down(self, touch=None):
-        if self.highlighted is not None:
-            if self.highlighted in self._pinned:
-                self._pinned.remove(self.highlighted)
+        lit = self.highlighted
+        if lit is not None:
+            if self._pinned[lit]:
+                self._pinned[lit] = False
             else:
-                if self.highlighted in self._selected:
-                    self._selected.remove(self.highlighted)
-                self._pinned.add(self.highlighted)
+                self._selected[lit] = False
+                self._pinned[lit] = True
+            self.node_state_changed(lit)
+            self.wake_layout()  # The user may have unpinned a node they dragged.
 
     @redraw_canvas_after
     def add_node_touch_down(self, touch):
         if self.highlighted is None:
             vertex = self.G.add_vertex(1)
             self.G.vp.pos[vertex][:] = self.invert_coords(touch.x, touch.y)
-            self.highlighted = self.nodes[vertex]
+            self.highlighted = int(vertex)
 
     @redraw_canvas_after
     def delete_node_touch_down(self, touch=None):
          if self.highlighted is not None:
-            self.G.remove_vertex(self.highlighted.vertex)
+            self.G.remove_vertex(self.G.vertex(self.highlighted))
 
     @redraw_canvas_after
     def add_edge_touch_down(self, touch=None):
@@ -376,8 +830,8 @@ class GraphCanvas(Widget):
             if self.source is None:
                 self.source = self.highlighted
             else:
-                if self.multigraph or self.G.edge(self.source.vertex, self.highlighted.vertex) is None:
-                    self.G.add_edge(self.source.vertex, self.highlighted.vertex)
+                if self.multigraph or self.G.edge(self.source, self.highlighted) is None:
+                    self.G.add_edge(self.source, self.highlighted)
                 self.source = None
 
     @redraw_canvas_after
@@ -388,11 +842,12 @@ class GraphCanvas(Widget):
             if self.source is None:
                 self.source = self.highlighted
             else:
-                edge = self.G.edge(self.source.vertex, self.highlighted.vertex)
+                edge = self.G.edge(self.source, self.highlighted)
                 if edge is not None:
                     self.G.remove_edge(edge)
                 self.source = None
 
+    @profiled('input')
     def on_touch_down(self, touch):
         if not self.collide_point(*touch.pos):
             return
@@ -410,11 +865,10 @@ class GraphCanvas(Widget):
 
             return True
 
-        highlighted = self.highlighted
-
         self.touch_down_dict[self.tool](touch)
         return True
 
+    @profiled('input')
     def on_touch_up(self, touch):
         if touch.grab_current is not self:
             return
@@ -423,15 +877,20 @@ class GraphCanvas(Widget):
         self._mouse_pos_disabled = False
         self.select_rect.color.a = 0
 
-    @redraw_canvas_after
+    @profiled('input')
     def on_touch_move(self, touch):
-        """Zoom if multitouch, else if a node is highlighted, drag it, else move the entire graph."""
+        """
+        Zoom if multitouch, else if a node is highlighted, drag it, else move the entire graph.  Dragging only redraws
+        the dragged nodes.
+        """
 
         if touch.grab_current is not self:
             return
 
         if len(self._touches) > 1:
-            return self.transform_on_touch(touch)
+            self.transform_on_touch(touch)
+            self.update_canvas()
+            return True
 
         if touch.button == 'right' or self.tool not in ('Select', 'Grab'):
             return
@@ -440,21 +899,36 @@ class GraphCanvas(Widget):
             self.select_rect.color.a = SELECT_RECT_COLOR[-1]
             return self.on_drag_select(touch)
 
-        if self._selected:
-            dx, dy = self.invert_coords(touch.dx, touch.dy, delta=True)
-            for node in self._selected:
-                x, y = self.G.vp.pos[node.vertex]
-                self.G.vp.pos[node.vertex][:] = x + dx, y + dy
+        if (selected := self._selected.a.astype(bool)).any():
+            pos = self.G.vp.pos.get_2d_array((0, 1))
+            pos[:, selected] += np.array(self.invert_coords(touch.dx, touch.dy, delta=True))[:, None]
+            self.G.vp.pos.set_2d_array(pos)
+
+            vertices = np.flatnonzero(selected)
+            self.moved(vertices, pos[:, vertices].T)
             return True
 
         if self.highlighted is not None:
-            self.G.vp.pos[self.highlighted.vertex][:] = self.invert_coords(touch.x, touch.y)
+            self.G.vp.pos[self.highlighted][:] = position = self.invert_coords(touch.x, touch.y)
+            self.moved(np.array([self.highlighted]), np.array([position]))
             return True
 
         self.offset_x += touch.dx / self.width
         self.offset_y += touch.dy / self.height
+        self.update_canvas()
         return True
 
+    def moved(self, vertices, positions):
+        """`vertices` were moved to the given (n, 2) layout positions; redraw only them."""
+        self.wake_layout()
+        if self.coords is None or len(self.coords) != self.G.num_vertices():
+            self._moved_vertices = None
+            return self.redraw()  # Coordinates are out of date anyway.
+
+        self.coords[vertices] = np.column_stack(self.transform_coords(*positions.T))
+        self.spatial_index.move(vertices, positions)
+        self.redraw(vertices.tolist())
+
     def transform_on_touch(self, touch):
         ax, ay = self._touches[-2].pos  # Anchor coords
         x, y = self.invert_coords(ax, ay)
@@ -477,23 +951,32 @@ class GraphCanvas(Widget):
         return True
 
     def on_drag_select(self, touch):
-        selected = self._selected
+        """
+        Select the unpinned vertices within the selection rectangle, and only them.  The previous event's selection
+        is kept, so only vertices that entered or left the rectangle are updated; the first event of a drag starts
+        from the selection before the drag.
+        """
         rect = self.select_rect
-        coords = self.coords
-
         rect.set_corners(touch.ox, touch.oy, touch.x, touch.y)
-        coords_within = ((rect.min_x, rect.min_y) <= coords) & (coords <= (rect.max_x, rect.max_y))
-        node_indices = np.argwhere(np.all(coords_within, axis=1))
-        nodes = (self.nodes[self.G.vertex(index)] for index in node_indices)
 
-        for node in selected.symmetric_difference(nodes):  # Note: Don't use update, we depend on
-            if node in selected:                           # remove/add methods of subclassed set.
-                selected.remove(node)
-            elif node not in self._pinned:
-                selected.add(node)
+        within = self.vertices_within(rect.min_x, rect.min_y, rect.max_x, rect.max_y)
+        within = np.unique(within[~self._pinned.a[within].astype(bool)])
+
+        previous = self._drag_selection
+        if previous is None:
+            previous = np.flatnonzero(self._selected.a)
+        previous = previous[previous < self.G.num_vertices()]  # Vertices may have been removed since.
+        self._drag_selection = within
+
+        changed = np.setxor1d(previous, within, assume_unique=True)
+        self._selected.a[changed] = np.isin(changed, within, assume_unique=True)
+        self.refresh_pins(changed)
+
+        self.update_adjacency_list(changed.tolist())
 
         return True
 
+    @profiled('input')
     @limit(UPDATE_INTERVAL)
     def on_mouse_pos(self, *args):
         mx, my = args[-1]
@@ -501,17 +984,23 @@ class GraphCanvas(Widget):
         if self._mouse_pos_disabled or self.coords is None or not self.collide_point(mx, my):
             return
 
-        if (not self.adjacency_list.is_hidden
+        if (self.adjacency_list is not None and not self.adjacency_list.is_hidden
             and any(widget.collide_point(mx, my) for widget in self.walk()
                     if widget is not self and not isinstance(widget, Layout))):
             return
 
         # Check collision with already highlighted node first:
-        if self.highlighted is not None and self.highlighted.collides(mx, my):
+        if self.highlighted is not None and self.collides(self.highlighted, mx, my):
             return
 
-        self.highlighted = None
+        collisions = self.vertices_within(mx - BOUNDS, my - BOUNDS, mx + BOUNDS, my + BOUNDS)
+        self.highlighted = int(collisions.min()) if len(collisions) else None
+
+    def vertices_within(self, x1, y1, x2, y2):
+        """Vertices within the rectangle with canvas coordinate corners (x1, y1) and (x2, y2)."""
+        vertices = self.spatial_index.query(*self.invert_coords(x1, y1), *self.invert_coords(x2, y2))
+        return vertices[vertices < self.G.num_vertices()]  # Index may predate a vertex removal.
 
-        collisions = np.argwhere(np.all(np.isclose(self.coords, (mx, my), atol=BOUNDS), axis=1))
-        if len(collisions):
-            self.highlighted = self.nodes[self.G.vertex(collisions[0][0])]
+    def collides(self, vertex, mx, my):
+        x, y = self.coords[vertex]
+        return abs(x - mx) <= BOUNDS and abs(y - my) <= BOUNDS
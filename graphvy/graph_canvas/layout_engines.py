@@ -0,0 +1,204 @@
+"""
+Layout engines that the LayoutWorker steps on its copy of the graph.
+"""
+from graph_tool.draw import sfdp_layout
+import numpy as np
+
+from ..constants import BARNES_HUT_SETTINGS, SFDP_SETTINGS
+
+MAX_DEPTH = 16  # of the quadtree; Morton codes of 2 * MAX_DEPTH bits must fit in an int64
+COOLING = .9    # step size is multiplied (or divided) by this to cool (or heat) the layout
+
+
+class LayoutEngine:
+    """
+    `step` moves the unpinned vertices of G (a Graph or, for local layout, a GraphView) in the vector property
+    `pos`.  Engines may keep state between steps; `reset` is called whenever the worker starts laying out a new
+    graph.
+    """
+
+    def reset(self):
+        pass
+
+    def step(self, G, pos, pin):
+        raise NotImplementedError
+
+
+class SFDPEngine(LayoutEngine):
+    """graph-tool's sfdp_layout."""
+
+    def __init__(self, settings=SFDP_SETTINGS):
+        self.settings = settings
+
+    def step(self, G, pos, pin):
+        sfdp_layout(G, pos=pos, pin=pin, **self.settings)
+
+
+class BarnesHutEngine(LayoutEngine):
+    """
+    Spring-electrical layout (the same forces as sfdp) with repulsion approximated by a Barnes-Hut quadtree, in
+    NumPy.  The quadtree is walked for all leaves at once, one level at a time.
+
+    `theta` trades accuracy for speed: a cell is treated as a single mass when its size is less than theta times
+    its distance.  Leaves are walked in chunks of `chunk` to bound memory.  The step size adapts between steps as
+    in sfdp: it grows while the energy keeps falling and shrinks when it rises.
+    """
+
+    def __init__(self, settings=BARNES_HUT_SETTINGS, chunk=1 << 16):
+        self.theta = settings['theta']
+        self.leaf_size = settings['leaf_size']
+        self.K = settings['K']
+        self.C = settings['C']
+        self.p = settings['p']
+        self.init_step = settings['init_step']
+        self.max_iter = settings['max_iter']
+        self.chunk = chunk
+        self.reset()
+
+    def reset(self):
+        self.step_size = self.init_step
+        self._energy = np.inf
+        self._progress = 0
+
+    def step(self, G, pos, pin):
+        vertices = G.get_vertices()
+        if len(vertices) < 2:
+            return
+
+        positions = pos.get_2d_array((0, 1)).T
+        X = positions[vertices]
+
+        local = np.full(len(positions), -1, dtype=np.int64)  # Graph vertex -> row of X
+        local[vertices] = np.arange(len(vertices))
+        edges = local[G.get_edges()[:, :2]]
+
+        movable = ~pin.a[vertices].astype(bool)
+
+        for _ in range(self.max_iter):
+            force = self.repulsion(X) + self.attraction(X, edges)
+            norm = np.hypot(force[:, 0], force[:, 1])
+            moving = movable & (norm > 0)
+            X[moving] += self.step_size * force[moving] / norm[moving, None]
+            self._cool((norm ** 2).sum())
+
+        positions[vertices] = X
+        pos.set_2d_array(positions.T)
+
+    def _cool(self, energy):
+        if energy < self._energy:
+            self._progress += 1
+            if self._progress >= 5:
+                self._progress = 0
+                self.step_size /= COOLING
+        else:
+            self._progress = 0
+            self.step_size *= COOLING
+
+        self.step_size = min(max(self.step_size, self.init_step * .1), self.init_step * 10)
+        self._energy = energy
+
+    def attraction(self, X, edges):
+        """Force of springs along `edges` (an (E, 2) array of rows of X): |d|^2 / K."""
+        d = X[edges[:, 1]] - X[edges[:, 0]]
+        f = d * (np.hypot(d[:, 0], d[:, 1]) / self.K)[:, None]
+
+        n = len(X)
+        force = np.empty_like(X)
+        for axis in range(2):
+            force[:, axis] = (np.bincount(edges[:, 0], f[:, axis], minlength=n)
+                              - np.bincount(edges[:, 1], f[:, axis], minlength=n))
+        return force
+
+    def repulsion(self, X):
+        """
+        Electrical force of all points on each other, C * K^(1 + p) / |d|^p, approximated with a quadtree.  Points in
+        the same leaf walk the tree together, and the force of far cells is computed once per leaf, at the leaf's
+        center of mass.
+        """
+        n = len(X)
+        low = X.min(axis=0)
+        size = max((X.max(axis=0) - low).max(), 1e-9) * (1 + 1e-9)  # of the root cell
+        depth = int(np.clip(np.ceil(np.log(max(n / self.leaf_size, 1)) / np.log(4)), 1, MAX_DEPTH))
+
+        # Morton codes of the points' leaf cells: the code of a point's cell at level l is code >> 2 * (depth - l),
+        # and the children of cell c are 4c through 4c + 3.
+        grid = np.clip(((X - low) * ((1 << depth) / size)).astype(np.int64), 0, (1 << depth) - 1)
+        codes = np.zeros(n, dtype=np.int64)
+        for bit in range(depth):
+            codes |= ((grid[:, 0] >> bit) & 1) << (2 * bit)
+            codes |= ((grid[:, 1] >> bit) & 1) << (2 * bit + 1)
+
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        sorted_X = X[order]
+
+        levels = []  # Per level: sorted cell codes, number of points, centers of mass and first row in `order`
+        for level in range(depth + 1):
+            cells, starts = np.unique(sorted_codes >> (2 * (depth - level)), return_index=True)
+            counts = np.diff(np.append(starts, n))
+            centers = np.add.reduceat(sorted_X, starts, axis=0) / counts[:, None]
+            levels.append((cells, counts, centers, starts))
+
+        leaf_codes, leaf_counts, leaf_centers, leaf_starts = levels[-1]
+        leaf_of = np.repeat(np.arange(len(leaf_codes)), leaf_counts)  # Leaf of each row of `order`
+        offsets = sorted_X - leaf_centers[leaf_of]
+        radii = np.maximum.reduceat(np.hypot(offsets[:, 0], offsets[:, 1]), leaf_starts)
+
+        strength = self.C * self.K ** (1 + self.p)
+
+        def force_of(d, mass):
+            """Force of `mass` at offset -d."""
+            dist = np.maximum(np.hypot(d[:, 0], d[:, 1]), 1e-9)
+            return d * (strength * mass / dist ** (self.p + 1))[:, None]
+
+        leaf_force = np.zeros((len(leaf_codes), 2))  # Force of far cells on each leaf's center of mass
+        direct = np.zeros((n, 2))                       # Force of near points, by row of `order`
+
+        for start in range(0, len(leaf_codes), self.chunk):
+            leaves = np.arange(start, min(start + self.chunk, len(leaf_codes)))
+            cells = np.zeros(len(leaves), dtype=np.int64)  # Every leaf starts paired with the root.
+
+            for level, (level_cells, counts, centers, _) in enumerate(levels):
+                d = leaf_centers[leaves] - centers[cells]
+                own = (leaf_codes[leaves] >> (2 * (depth - level))) == level_cells[cells]
+                gap = np.hypot(d[:, 0], d[:, 1]) - radii[leaves]
+                far = ~own & (gap > 0) & (size / (1 << level) < self.theta * gap)
+
+                force = force_of(d[far], counts[cells[far]])
+                for axis in range(2):
+                    leaf_force[:, axis] += np.bincount(leaves[far], force[:, axis], minlength=len(leaf_codes))
+
+                leaves, cells = leaves[~far], cells[~far]
+                if level == depth:
+                    break
+
+                # Open near cells: pair their leaves with each existing child.
+                next_cells = levels[level + 1][0]
+                children = (level_cells[cells, None] * 4 + np.arange(4)).reshape(-1)
+                indices = np.minimum(np.searchsorted(next_cells, children), len(next_cells) - 1)
+                exists = next_cells[indices] == children
+                leaves, cells = np.repeat(leaves, 4)[exists], indices[exists]
+
+            # Leaves still paired with leaves interact point by point.
+            rows, cells = _expand(leaf_starts[leaves], leaf_counts[leaves], cells)
+            rows, others = _expand(leaf_starts[cells], leaf_counts[cells], rows)[::-1]
+            different = rows != others
+            rows, others = rows[different], others[different]
+
+            force = force_of(sorted_X[rows] - sorted_X[others], 1)
+            for axis in range(2):
+                direct[:, axis] += np.bincount(rows, force[:, axis], minlength=n)
+
+        force = np.empty_like(X)
+        force[order] = direct + leaf_force[leaf_of]
+        return force
+
+
+def _expand(starts, lengths, values):
+    """
+    Pair each of the ranges starts[i]:starts[i] + lengths[i] with values[i].  Returns the concatenated ranges and
+    the values repeated to match.
+    """
+    total = lengths.sum()
+    ranges = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+    return ranges, np.repeat(values, lengths)
@@ -0,0 +1,247 @@
+"""
+Runs the layout in a background thread so that drawing and input handling never wait on it.
+"""
+from threading import Event, Lock, Thread
+
+import graph_tool as gt
+import numpy as np
+
+from .layout_engines import SFDPEngine
+from ..constants import CONVERGENCE, LOCAL_LAYOUT
+
+
+class LayoutWorker:
+    """
+    The worker lays out its own copy of the graph with `engine` (a LayoutEngine, sfdp by default).  Each `post` (the
+    canvas's current topology, positions and pins) allows one layout step; if the worker is still busy, posts coalesce
+    and only the latest is used.  Finished positions are published as a (2, V) array that the canvas picks up with
+    `take`.
+
+    The canvas's graph keeps changing while a step runs.  Subscribe the worker to the graph (an ObservableGraph) so
+    that it sees vertex removals: `take` renumbers finished positions through the removals since they were posted,
+    and vertices added since have no positions.  `reset` starts over with a new graph.
+
+    If `local` is True, most steps only lay out the `hops`-hop neighbourhood of vertices whose edges changed in the
+    last `steps` steps (everything else is left where it is) and a global step is run every `global_every` steps.
+
+    The layout has `converged` when vertices moved less than `tolerance` per step, on average, over the last `window`
+    steps.  (Net movement is measured, since sfdp keeps vertices jittering around their final positions.)  Changes to
+    the topology, the pins or the positions of pinned vertices restart the measurement.
+    """
+
+    def __init__(self, engine=None, local=False, local_settings=LOCAL_LAYOUT, convergence=CONVERGENCE):
+        self.engine = SFDPEngine() if engine is None else engine
+        self.local = local
+        self.local_settings = local_settings
+        self.convergence = convergence
+
+        self._lock = Lock()
+        self._posted = Event()
+        self._request = None
+        self._result = None
+        self._running = True
+        self._epoch = 0  # Incremented by reset; requests and results of an older epoch are of an old graph.
+
+        # (index, last) of vertex removals (see ObservableGraph) since the oldest request a result may still be for,
+        # and the number of removals before the first of them.  Only used from the main thread.
+        self._removals = []
+        self._removals_start = 0
+
+        # The worker's copy of the graph:
+        self._G = None
+        self._pos = None
+        self._pin = None
+        self._vertex_generation = self._edge_generation = self._worker_epoch = None
+        self._mutated = set()  # Vertices whose edges changed since the last step
+        self._active = {}      # Vertex -> number of local steps left to relax its neighbourhood
+        self._steps = 0
+
+        self.converged = False
+        self.displacement = None  # Mean distance moved per step over the last window
+        self._anchor = None       # Positions at the start of the current window
+        self._window_steps = 0
+
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def post(self, vertex_generation, edge_generation, edges, positions, pinned, mutated=()):
+        """
+        Request a layout step.  `edges` is an (E, 2) array and only needs to be current when edge_generation has
+        changed since the last post.  Positions of pinned vertices always overwrite the worker's positions.
+        `mutated` are vertices whose edges changed since the last post.
+        """
+        removals = self._removals_start + len(self._removals)
+        with self._lock:
+            self._request = self._epoch, removals, vertex_generation, edge_generation, edges, positions, pinned
+            self._mutated.update(mutated)
+        self._posted.set()
+
+    def vertex_removed(self, index, last):
+        self._removals.append((index, last))
+
+    def reset(self):
+        """The canvas has a new graph: forget the old one."""
+        with self._lock:
+            self._epoch += 1
+            self._request = self._result = None
+            self._mutated = set()
+        self._removals = []
+        self._removals_start = 0
+
+    def take(self, n):
+        """
+        Return the latest positions, a (2, n) array for the graph's current n vertices, and a boolean array of
+        the vertices that have positions (those added after the positions were posted don't), or None if there
+        aren't any new positions.
+        """
+        with self._lock:
+            result, self._result = self._result, None
+
+        if result is None or result[0] != self._epoch:
+            return None
+        _, removals, positions = result
+
+        applied = removals - self._removals_start
+        pending = self._removals[applied:]
+        del self._removals[:applied]  # Later results are of later posts.
+        self._removals_start = removals
+
+        # Column of `positions` of each vertex, or -1.  Removing `index` moves the last vertex into its place.
+        columns = np.arange(positions.shape[1])
+        for index, last in pending:
+            if last >= len(columns):  # Vertices were added since.
+                columns = np.concatenate((columns, np.full(last + 1 - len(columns), -1)))
+            columns[index] = columns[last]
+            columns = columns[:last]
+        if len(columns) < n:
+            columns = np.concatenate((columns, np.full(n - len(columns), -1)))
+        columns = columns[:n]
+
+        known = columns >= 0
+        return positions[:, np.where(known, columns, 0)], known
+
+    def wake(self):
+        """The graph is about to change: the layout hasn't converged until measured again."""
+        self._restart_convergence()
+
+    def stop(self):
+        self._running = False
+        self._posted.set()
+
+    def _run(self):
+        while True:
+            self._posted.wait()
+            with self._lock:
+                request, self._request = self._request, None
+                mutated, self._mutated = self._mutated, set()
+                self._posted.clear()
+
+            if not self._running:
+                return
+
+            if request is not None:
+                self._step(*request, mutated=mutated)
+
+    def _step(self, epoch, removals, vertex_generation, edge_generation, edges, positions, pinned, mutated=()):
+        engine = self.engine  # May be swapped from the main thread; use one engine for the whole step.
+
+        if epoch != self._worker_epoch:
+            self._worker_epoch = epoch
+            self._vertex_generation = None  # A new graph
+            engine.reset()
+        if vertex_generation != self._vertex_generation:
+            self._active.clear()  # Vertices were renumbered.
+            self._rebuild(edges, positions)
+            self._restart_convergence()
+        else:
+            if edge_generation != self._edge_generation:
+                self._rebuild(edges, self._pos.get_2d_array((0, 1)))
+                self._restart_convergence()
+
+            current = self._pos.get_2d_array((0, 1))
+            if ((self._pin.a.astype(bool) != pinned).any()
+                or (current[:, pinned] != positions[:, pinned]).any()):  # Pins changed or pinned vertices dragged
+                self._restart_convergence()
+            current[:, pinned] = positions[:, pinned]
+            self._pos.set_2d_array(current)
+
+        self._vertex_generation = vertex_generation
+        self._edge_generation = edge_generation
+        self._pin.a[:] = pinned
+
+        if not self.local or self._steps % self.local_settings['global_every'] == 0:
+            self._active.clear()
+            engine.step(self._G, self._pos, self._pin)
+        elif not self._local_step(engine, mutated):
+            self._steps += 1
+            self._measure(self._pos.get_2d_array((0, 1)))
+            return  # Nothing changed, nothing to publish.
+
+        self._steps += 1
+        positions = self._pos.get_2d_array((0, 1))
+        self._measure(positions)
+        with self._lock:
+            self._result = epoch, removals, positions
+
+    def _restart_convergence(self):
+        with self._lock:
+            self.converged = False
+            self._anchor = None
+
+    def _measure(self, positions):
+        """Update `converged` with the (2, V) positions after a step."""
+        with self._lock:
+            if self._anchor is None:
+                self._anchor, self._window_steps = positions, 0
+                return
+
+            self._window_steps += 1
+            if self._window_steps < self.convergence['window']:
+                return
+
+            moved = positions - self._anchor
+            self.displacement = np.hypot(*moved).mean() / self._window_steps if moved.size else 0.0
+            self.converged = self.displacement < self.convergence['tolerance']
+            self._anchor, self._window_steps = positions, 0
+
+    def _local_step(self, engine, mutated):
+        """
+        Lay out the neighbourhood of recently mutated vertices, with the vertices just outside it pinned so that it
+        stays attached to the rest of the graph.  Returns False if there was nothing to lay out.
+        """
+        steps = self.local_settings['steps']
+        n = self._G.num_vertices()
+        self._active.update((vertex, steps) for vertex in mutated if vertex < n)
+        if not self._active:
+            return False
+
+        G = self._G
+        region = np.zeros(n, dtype=bool)
+        region[list(self._active)] = True
+
+        frontier = np.flatnonzero(region)
+        for _ in range(self.local_settings['hops'] + 1):  # One extra hop for the pinned boundary
+            inner = region.copy()
+            neighbors = [G.get_all_neighbors(vertex) for vertex in frontier.tolist()]
+            if not neighbors:
+                break
+            neighbors = np.unique(np.concatenate(neighbors)).astype(np.int64)
+            frontier = neighbors[~region[neighbors]]
+            region[frontier] = True
+
+        pin = G.new_vertex_property('bool')
+        pin.a[:] = self._pin.a | ~inner
+        engine.step(gt.GraphView(G, vfilt=region), self._pos, pin)
+
+        self._active = {vertex: left - 1 for vertex, left in self._active.items() if left > 1}
+        return True
+
+    def _rebuild(self, edges, positions):
+        """New copy of the graph with the given (2, V) positions."""
+        self._G = G = gt.Graph()
+        G.add_vertex(positions.shape[1])
+        G.add_edge_list(edges)
+
+        self._pos = gt.group_vector_property([G.new_vertex_property('double', vals=coordinate)
+                                              for coordinate in positions])
+        self._pin = G.new_vertex_property('bool')
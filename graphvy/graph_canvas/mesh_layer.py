@@ -0,0 +1,112 @@
+"""
+Base class for canvas layers that draw many identical primitives from one contiguous vertex buffer.
+"""
+import numpy as np
+
+from kivy.graphics import Mesh, RenderContext
+
+# Each vertex is x, y, u, v, r, g, b, a.  (u, v) are used by the fragment shader to cut discs (or rings, with the
+# `inner_radius` uniform) out of quads; primitives that shouldn't be cut leave them at 0.
+VERTEX_FORMAT = [(b'vPosition', 2, 'float'), (b'vTexCoords0', 2, 'float'), (b'vColor', 4, 'float')]
+VERTEX_SIZE = 8
+
+MAX_INDICES = 65535  # OpenGL ES 2.0 limit on the number of indices of a single Mesh.
+
+VERTEX_SHADER = """
+$HEADER$
+attribute vec4 vColor;
+
+void main(void) {
+    frag_color = vColor;
+    tex_coord0 = vTexCoords0;
+    gl_Position = projection_mat * modelview_mat * vec4(vPosition.xy, 0.0, 1.0);
+}
+"""
+
+FRAGMENT_SHADER = """
+$HEADER$
+uniform float inner_radius;
+
+void main(void) {
+    float r2 = dot(tex_coord0, tex_coord0);
+    if (r2 > 1.0 || r2 < inner_radius * inner_radius) discard;
+    gl_FragColor = frag_color;
+}
+"""
+
+
+class MeshLayer:
+    """
+    Draws `n` primitives, each made of `vertices_per_item` vertices and triangulated by `item_indices`.
+
+    All vertices live in `self.vertices`, an (capacity, vertices_per_item, VERTEX_SIZE) float32 array, which
+    is handed to as few Mesh instructions as the index limit allows.  Subclasses fill the first `n` items of
+    the buffer and call `upload` (or change a few items and call `upload_items`).  Add `render_context` to a canvas
+    to draw the layer.
+    """
+    vertices_per_item = 0
+    item_indices = ()
+
+    def __init__(self):
+        self.render_context = RenderContext(vs=VERTEX_SHADER, fs=FRAGMENT_SHADER,
+                                            use_parent_projection=True,
+                                            use_parent_modelview=True)
+        self.render_context['inner_radius'] = 0.0
+        self.meshes = []
+        self.n = 0
+        self.vertices = np.zeros((0, self.vertices_per_item, VERTEX_SIZE), dtype=np.float32)
+
+        indices_per_item = len(self.item_indices)
+        self.items_per_mesh = MAX_INDICES // indices_per_item
+
+        offsets = np.arange(self.items_per_mesh)[:, None] * self.vertices_per_item
+        self._indices = (offsets + self.item_indices).astype(np.uint16).reshape(-1)
+
+    @property
+    def capacity(self):
+        return len(self.vertices)
+
+    def resize(self, n):
+        """Make room for n items.  The buffer grows geometrically so that adding items one at a time is cheap."""
+        if n > self.capacity:
+            vertices = np.zeros((max(n, 2 * self.capacity), self.vertices_per_item, VERTEX_SIZE),
+                                dtype=np.float32)
+            vertices[:self.n] = self.vertices[:self.n]
+            self.vertices = vertices
+            self._rebuild_meshes()
+
+        self.n = n
+        self._set_indices()
+
+    def _rebuild_meshes(self):
+        self.render_context.clear()
+        self.meshes = []
+
+        per_mesh = self.items_per_mesh
+        for start in range(0, self.capacity, per_mesh):
+            mesh = Mesh(fmt=VERTEX_FORMAT, mode='triangles',
+                        vertices=self.vertices[start: start + per_mesh].reshape(-1))
+            self.render_context.add(mesh)
+            self.meshes.append(mesh)
+
+    def _set_indices(self):
+        """Only the first n items are drawn."""
+        per_mesh = self.items_per_mesh
+        indices_per_item = len(self.item_indices)
+        for i, mesh in enumerate(self.meshes):
+            count = min(max(self.n - i * per_mesh, 0), per_mesh)
+            mesh.indices = self._indices[:count * indices_per_item]
+
+    def upload(self, start=0, stop=None):
+        """Flag the meshes that hold items start through stop for re-upload."""
+        stop = self.n if stop is None else stop
+        per_mesh = self.items_per_mesh
+
+        for i in range(start // per_mesh, -(-stop // per_mesh)):
+            self.meshes[i].vertices = self.vertices[i * per_mesh: (i + 1) * per_mesh].reshape(-1)
+
+    def upload_items(self, items):
+        """Flag only the meshes that hold the given items for re-upload."""
+        per_mesh = self.items_per_mesh
+        for i in np.unique(np.asarray(items) // per_mesh).tolist():
+            self.meshes[i].vertices = self.vertices[i * per_mesh: (i + 1) * per_mesh].reshape(-1)
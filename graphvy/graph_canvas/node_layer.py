@@ -0,0 +1,65 @@
+"""
+All nodes of the graph as rings, computed in a single vectorized pass.
+"""
+import numpy as np
+
+from .mesh_layer import MeshLayer
+from ..constants import NODE_RADIUS, NODE_WIDTH
+
+# Texture coordinates of a quad's corners; the fragment shader discards everything outside the unit circle (and
+# inside the inner radius).
+CORNERS = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=np.float32)
+
+
+class NodeLayer(MeshLayer):
+    """
+    Each node is a quad centered on the node that the shader cuts into a ring between `inner_radius` and `radius`
+    (or, if `rings` is False, a disc): 4 vertices, 2 triangles.
+    """
+    vertices_per_item = 4
+    item_indices = 0, 1, 2, 0, 2, 3
+
+    def __init__(self, radius=NODE_RADIUS + NODE_WIDTH, inner_radius=NODE_RADIUS):
+        super().__init__()
+        self.radius = radius
+        self.inner_radius = inner_radius
+        self.rings = True
+
+    @property
+    def rings(self):
+        return self._rings
+
+    @rings.setter
+    def rings(self, rings):
+        self._rings = rings
+        self.render_context['inner_radius'] = self.inner_radius / self.radius if rings else 0.0  # In texture coords
+
+    def resize(self, n):
+        capacity = self.capacity
+        super().resize(n)
+        if self.capacity != capacity:  # New buffer; texture coordinates never change so we set them once here.
+            self.vertices[:, :, 2:4] = CORNERS
+
+    def update(self, coords, colors, items=None, slots=None):
+        """
+        Recompute all nodes.  `coords` is the (V, 2) array of canvas coordinates of the nodes and `colors` is a
+        (V, 4) array of rgba values.
+
+        If `items` (an array of vertices) is given, only those nodes are recomputed, into the given `slots` of the
+        layer (default: `items`), and `colors` is only theirs.
+        """
+        if items is not None:
+            slots = items if slots is None else slots
+            self.vertices[slots, :, :2] = coords[items][:, None] + CORNERS * self.radius
+            self.vertices[slots, :, 4:] = colors[:, None]
+            return self.upload_items(slots)
+
+        self.resize(len(coords))
+        if not len(coords):
+            return
+
+        vertices = self.vertices[:len(coords)]
+        vertices[:, :, :2] = coords[:, None] + CORNERS * self.radius
+        vertices[:, :, 4:] = colors[:, None]
+
+        self.upload()
@@ -0,0 +1,188 @@
+"""
+Playback of recorded simulations (see recording.py) on the graph canvas.
+"""
+from collections import deque
+
+from kivy.clock import Clock
+
+from ..recording import ADD_VERTEX, REMOVE_VERTEX, ADD_EDGE, REMOVE_EDGE, SET_VERTEX, SET_EDGE
+
+UNDO_LIMIT = 1_000_000  # records that can be undone without reloading a keyframe
+
+
+class Player:
+    """
+    Plays a Recording on a GraphCanvas.  `seek` jumps to any step, `play` plays forwards (or, for negative speeds,
+    backwards) at `speed` steps per second.  All edits go through the canvas's GraphInterface, one batch per seek.
+
+    Seeking forwards applies the records in between, or jumps to a keyframe first if one is closer.  Each applied
+    record's inverse is kept (up to `undo_limit` of them), so seeking backwards is as cheap as seeking forwards,
+    except past a vertex removal (which can't be undone) or further back than what was applied: then the graph is
+    reloaded from a keyframe.  It's also reloaded if the canvas was given another graph.
+    """
+
+    def __init__(self, graph_canvas, recording, undo_limit=UNDO_LIMIT):
+        self.graph_canvas = graph_canvas
+        self.recording = recording
+
+        self.step = None  # The graph is the recording after this many steps.
+        self.record = 0   # Records applied
+        self.speed = 0
+
+        # Python type of each recorded property's values; values are recorded as doubles.
+        self._types = [bool if value_type == 'bool' else float if 'double' in value_type else int
+                       for _, _, value_type in recording.properties]
+
+        self._undo = deque(maxlen=undo_limit)  # Records that undo each of the last applied records, or None
+        self._keyframe = None  # (index, Graph) of the last loaded keyframe
+        self._G = None  # The canvas's graph that the recording is applied to
+        self._position = 0.0   # Fractional step while playing
+        self._event = None
+
+        self.seek(0)
+
+    @property
+    def is_playing(self):
+        return self._event is not None
+
+    def play(self, speed):
+        """Play at `speed` steps per second (negative to play backwards)."""
+        self.speed = speed
+        self._position = self.step
+        if self._event is None:
+            self._event = Clock.schedule_interval(self._tick, 0)
+
+    def pause(self):
+        self.speed = 0
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+    def _tick(self, dt):
+        self._position = min(max(self._position + self.speed * dt, 0), len(self.recording))
+        self.seek(int(self._position))
+        if self._position in (0, len(self.recording)):
+            self.pause()
+
+    def seek(self, step):
+        """Make the graph the recording after `step` steps."""
+        recording = self.recording
+        step = min(max(int(step), 0), len(recording))
+        if self.graph_canvas.G is not self._G:
+            self.step = None
+        elif step == self.step:
+            return
+
+        keyframe = recording.keyframe_before(step)
+        keyframe_record = int(recording.keyframe_records[keyframe])
+        end = max(recording.records_before(step), keyframe_record)  # Edits before a keyframe are in the keyframe.
+
+        if self.step is None or (end >= self.record and keyframe_record > self.record):
+            self._load_keyframe(keyframe)
+            self._apply(end)
+        elif end >= self.record:
+            self._apply(end)
+        elif not self._undo_to(end):
+            self._load_keyframe(keyframe)
+            self._apply(end)
+
+        self.step = step
+
+    def _load_keyframe(self, index):
+        if self._keyframe is None or self._keyframe[0] != index:
+            self._keyframe = index, self.recording.load_keyframe(index)
+
+        # Loading a graph resets the view; keep it.
+        graph_canvas = self.graph_canvas
+        view = graph_canvas.offset_x, graph_canvas.offset_y, graph_canvas.scale
+        graph_canvas.load_graph(G=self._keyframe[1])  # The canvas copies the keyframe.
+        graph_canvas.offset_x, graph_canvas.offset_y, graph_canvas.scale = view
+        graph_canvas.update_canvas()
+        self._G = graph_canvas.G
+
+        self.record = int(self.recording.keyframe_records[index])
+        self._undo.clear()
+
+    def _apply(self, end):
+        """Apply records up to `end`."""
+        records = self.recording.deltas[self.record:end]
+        if not len(records):
+            return
+
+        G = self.graph_canvas.G
+        with G.batch():
+            undo = self._undo
+            for _, op, key, a, b, value in records.tolist():
+                undo.append(self._apply_record(G, op, key, a, b, value))
+        self.record = end
+
+    def _undo_to(self, end):
+        """Undo records back to `end`.  Returns False if they can't all be undone."""
+        undo = self._undo
+        if self.record - end > len(undo):
+            return False
+
+        G = self.graph_canvas.G
+        with G.batch():
+            while self.record > end:
+                if (inverse := undo.pop()) is None:
+                    return False
+                for record in inverse:
+                    self._apply_record(G, *record)
+                self.record -= 1
+        return True
+
+    def _property(self, G, key):
+        """The property map recorded as `key`, created if the graph doesn't have it yet."""
+        kind, name, value_type = self.recording.properties[key]
+        properties = G.vp if kind == 'v' else G.ep
+        if name not in properties:
+            properties[name] = G.new_vertex_property(value_type) if kind == 'v' else G.new_edge_property(value_type)
+        return properties[name]
+
+    def _apply_record(self, G, op, key, a, b, value):
+        """Apply a record to G.  Returns records that undo it, or None if it can't be undone."""
+        if op == ADD_EDGE:
+            G.add_edge(a, b)
+            return (REMOVE_EDGE, 0, a, b, 0.0),
+
+        if op == REMOVE_EDGE:
+            if (edge := G.edge(a, b)) is None:
+                return ()
+            inverse = [(ADD_EDGE, 0, a, b, 0.0)]
+            inverse.extend((SET_EDGE, key, a, b, float(self._property(G, key)[edge]))
+                           for key, (kind, *_) in enumerate(self.recording.properties) if kind == 'e')
+            G.remove_edge(edge)
+            return inverse
+
+        if op == SET_EDGE:
+            if (edge := G.edge(a, b)) is None:
+                return ()
+            property_ = self._property(G, key)
+            old = float(property_[edge])
+            property_[edge] = self._types[key](value)
+            return (SET_EDGE, key, a, b, old),
+
+        if op == SET_VERTEX:
+            if a >= G.num_vertices():
+                return ()
+            property_ = self._property(G, key)
+            old = float(property_[a])
+            property_[a] = self._types[key](value)
+            return (SET_VERTEX, key, a, b, old),
+
+        if op == ADD_VERTEX:
+            vertex = int(G.add_vertex())
+            return (REMOVE_VERTEX, 0, vertex, vertex, 0.0),
+
+        if op == REMOVE_VERTEX:
+            G.remove_vertex(G.vertex(a))
+            return None
+
+        raise ValueError(f'unknown record operation {op}')
+
+    def close(self):
+        self.pause()
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.recording!r}, step={self.step}, speed={self.speed})'
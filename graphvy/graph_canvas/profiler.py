@@ -0,0 +1,163 @@
+"""
+Per-frame timings of GraphCanvas's hot paths and a HUD to show them.
+"""
+import csv
+from functools import wraps
+from time import perf_counter
+
+from kivy.clock import Clock
+from kivy.core.text import Label as CoreLabel
+from kivy.graphics import Color, Rectangle
+import numpy as np
+
+from ..constants import HIGHLIGHTED_NODE
+
+STAGES = 'step_layout', 'callback', 'update_canvas', 'redraw_dirty', 'transform_coords', 'update_layers', 'input'
+FRAMES = 600        # frames kept by the profiler
+SUMMARY_FRAMES = 60  # frames averaged by the HUD
+HUD_INTERVAL = .25  # seconds between HUD updates
+
+
+def profiled(stage):
+    """Decorator for GraphCanvas methods: adds the time spent in the method to `stage` when profiling."""
+    def deco(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.profiler
+            if not profiler.enabled:
+                return func(self, *args, **kwargs)
+
+            start = perf_counter()
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                profiler.add(stage, perf_counter() - start)
+
+        return wrapper
+    return deco
+
+
+class Profiler:
+    """
+    Time spent in each stage of the last `frames` frames, kept in ring buffers.  Stage times are summed over all calls
+    in a frame and include nested stages (e.g., update_canvas includes transform_coords).  Nothing is recorded unless
+    the profiler is started.
+    """
+
+    def __init__(self, graph_canvas, frames=FRAMES, stages=STAGES):
+        self.graph_canvas = graph_canvas
+        self.stages = stages
+        self._columns = {stage: column for column, stage in enumerate(stages)}
+
+        self.times = np.zeros((frames, len(stages)))           # seconds per stage
+        self.frame_times = np.zeros(frames)                    # seconds per frame
+        self.counts = np.zeros((frames, 2), dtype=np.int64)  # vertices and edges at the end of the frame
+        self.frame = 0  # Number of frames recorded; row `frame % frames` is being recorded.
+
+        self.enabled = False
+        self._event = None
+        self._last = None
+
+    def start(self):
+        if not self.enabled:
+            self.enabled = True
+            self._last = perf_counter()
+            self._event = Clock.schedule_interval(self._end_frame, 0)
+
+    def stop(self):
+        if self.enabled:
+            self.enabled = False
+            self._event.cancel()
+
+    def add(self, stage, seconds):
+        self.times[self.frame % len(self.times), self._columns[stage]] += seconds
+
+    def _end_frame(self, dt):
+        row = self.frame % len(self.times)
+
+        now = perf_counter()
+        self.frame_times[row] = now - self._last
+        self._last = now
+
+        G = self.graph_canvas.G
+        self.counts[row] = G.num_vertices(), G.num_edges()
+
+        self.frame += 1
+        self.times[self.frame % len(self.times)] = 0
+
+    def recent(self, n=None):
+        """Frame times, stage times and counts of the last n (default: all kept) frames, oldest first."""
+        kept = min(self.frame, len(self.times))
+        n = kept if n is None else min(n, kept)
+        rows = np.arange(self.frame - n, self.frame) % len(self.times)
+        return self.frame_times[rows], self.times[rows], self.counts[rows]
+
+    def summary(self, n=SUMMARY_FRAMES):
+        """Frames per second, mean milliseconds per stage and the latest counts over the last n frames."""
+        frame_times, times, counts = self.recent(n)
+        if not len(frame_times):
+            return {}
+
+        vertices, edges = counts[-1].tolist()
+        return dict(fps=len(frame_times) / frame_times.sum(),
+                    **dict(zip(self.stages, (times.mean(axis=0) * 1e3).tolist())),
+                    vertices=vertices, edges=edges)
+
+    def to_csv(self, path):
+        """Write every kept frame to a csv file, times in milliseconds."""
+        frame_times, times, counts = self.recent()
+        first = self.frame - len(frame_times)
+
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(('frame', 'frame_ms', *(f'{stage}_ms' for stage in self.stages), 'vertices', 'edges'))
+            for frame, row in enumerate(np.column_stack((frame_times * 1e3, times * 1e3)).tolist(), start=first):
+                writer.writerow((frame, *row, *counts[frame - first].tolist()))
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.summary()})'
+
+
+class ProfilerHUD:
+    """Shows the profiler's summary in the top left of the graph canvas.  The profiler runs while the HUD is shown."""
+
+    def __init__(self, graph_canvas, profiler):
+        self.graph_canvas = graph_canvas
+        self.profiler = profiler
+
+        with graph_canvas.canvas.after:
+            self._color = Color(1, 1, 1, 0)
+            self._rect = Rectangle()
+        self._label = CoreLabel(font_size=14, color=HIGHLIGHTED_NODE, halign='left')
+
+        self._event = None
+
+    @property
+    def is_shown(self):
+        return self._event is not None
+
+    def toggle(self):
+        if self.is_shown:
+            self._event.cancel()
+            self._event = None
+            self._color.a = 0
+            self.profiler.stop()
+        else:
+            self.profiler.start()
+            self._event = Clock.schedule_interval(self.update, HUD_INTERVAL)
+            self._color.a = 1
+
+    def update(self, dt=None):
+        if not (summary := self.profiler.summary()):
+            return
+
+        lines = [f'{summary["fps"]:5.1f} fps   V {summary["vertices"]:,}   E {summary["edges"]:,}',
+                 f'{self.graph_canvas.steps_per_second:,.0f} rule steps/s   layout {self.graph_canvas.layout_state}']
+        lines.extend(f'{stage:<17}{summary[stage]:7.2f} ms' for stage in self.profiler.stages)
+
+        self._label.text = '\n'.join(lines)
+        self._label.refresh()
+
+        texture = self._rect.texture = self._label.texture
+        self._rect.size = texture.size
+        self._rect.pos = self.graph_canvas.x + 10, self.graph_canvas.top - texture.height - 10
@@ -0,0 +1,144 @@
+"""
+Uniform grid over vertex positions for hit-testing and rectangle selection in time proportional to the number of
+nearby vertices.
+"""
+import numpy as np
+
+REBUILD_FRACTION = .5  # of vertices that changed cells (or left the grid) before the grid is rebuilt
+
+
+class GridIndex:
+    """
+    Vertices are bucketed by grid cell and sorted by cell, so each row of cells is a contiguous slice of
+    `self.order`.  The grid is over layout coordinates (vp.pos), so panning and zooming don't invalidate it.
+
+    `update` and `move` only mark the index stale, since positions change every frame while the layout runs and
+    queries are far rarer.  The next `query` re-keys only the vertices that moved since the last query (all of them,
+    if `update` wasn't told which moved) and merges those that changed cells back into the sorted order without
+    sorting all vertices again.  The grid is rebuilt if the number of vertices changed, or if more than
+    `rebuild_fraction` of the vertices changed cells or are outside the grid.
+
+    Merging still copies the sorted order, so while the layout moves vertices across cells the first query after each
+    layout frame is O(V); hover is only O(k) for k nearby vertices once the layout is idle.
+    """
+
+    def __init__(self, rebuild_fraction=REBUILD_FRACTION):
+        self.rebuild_fraction = rebuild_fraction
+        self.positions = None
+        self._keys = None  # Cell of each vertex when it was last bucketed
+        self._outside = None  # Whether each vertex was outside the grid when it was last bucketed
+        self._moved = None  # Arrays of vertices that moved since the last refresh, or None if any may have
+        self._stale = False
+
+    def update(self, positions, moved=None):
+        """
+        `positions` is a (V, 2) array of layout coordinates; the index keeps (and `move` modifies) it.  `moved` are
+        the only vertices whose positions changed since the last `update`, if known.
+        """
+        self.positions = positions
+        self._mark_moved(moved)
+
+    def move(self, vertices, positions):
+        """Only `vertices` moved, to the given (n, 2) positions."""
+        if self.positions is None or not len(vertices) or np.max(vertices) >= len(self.positions):
+            return  # The index is out of date anyway; the next `update` replaces the positions.
+
+        self.positions[vertices] = positions
+        self._mark_moved(vertices)
+
+    def _mark_moved(self, vertices):
+        if vertices is None:
+            self._moved = None
+        elif self._moved is not None:
+            self._moved.append(np.asarray(vertices, dtype=np.int64))
+        self._stale = True
+
+    def _refresh(self):
+        self._stale = False
+        positions = self.positions
+        moved, self._moved = self._moved, []
+        if self._keys is None or len(positions) != len(self._keys):
+            return self._build()
+
+        if moved is None:
+            rows = np.arange(len(positions))
+        elif moved:
+            rows = np.unique(np.concatenate(moved))
+        else:
+            return
+
+        cells = self._raw_cells(positions[rows])
+        self._outside[rows] = np.any((cells < 0) | (cells >= (self._cols, self._rows)), axis=1)
+        keys = self._key(cells)
+        changed = rows[keys != self._keys[rows]]
+        if not len(changed):
+            return
+        if len(changed) + np.count_nonzero(self._outside) > self.rebuild_fraction * len(positions):
+            return self._build()
+
+        # Take the changed vertices out of the sorted order and merge them back in at their new cells.
+        self._keys[rows] = keys
+        keys = self._keys
+        is_changed = np.zeros(len(keys), dtype=bool)
+        is_changed[changed] = True
+        rest = self.order[~is_changed[self.order]]
+        changed = changed[np.argsort(keys[changed], kind='stable')]
+        self.order = np.insert(rest, np.searchsorted(keys[rest], keys[changed], side='right'), changed)
+
+        self._count_cells()
+
+    def _build(self):
+        positions = self.positions
+        n = len(positions)
+
+        if n:
+            self._min = positions.min(axis=0)
+            span = np.maximum(positions.max(axis=0) - self._min, 1e-9)
+        else:
+            self._min, span = np.zeros(2), np.ones(2)
+
+        # About two vertices per cell, cells roughly square.
+        cells = max(n // 2, 1)
+        aspect = span[0] / span[1]
+        self._cols = int(np.clip(np.sqrt(cells * aspect), 1, cells))
+        self._rows = max(cells // self._cols, 1)
+        self._cell_size = span / (self._cols, self._rows)
+
+        self._keys = self._key(self._raw_cells(positions))
+        self._outside = np.zeros(n, dtype=bool)  # The grid spans every position.
+        self.order = np.argsort(self._keys, kind='stable')
+        self._count_cells()
+
+    def _count_cells(self):
+        self._starts = np.zeros(self._cols * self._rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self._keys, minlength=self._cols * self._rows), out=self._starts[1:])
+
+    def _raw_cells(self, points):
+        """Cells of points, unclipped: points outside the grid have cells outside it."""
+        return np.floor((points - self._min) / self._cell_size).astype(np.int64)
+
+    def _clip(self, cells):
+        return np.clip(cells, 0, (self._cols - 1, self._rows - 1))
+
+    def _key(self, cells):
+        """Index of each cell, with cells outside the grid bucketed in the nearest cell at its edge."""
+        columns, rows = self._clip(cells).T
+        return rows * self._cols + columns
+
+    def query(self, x1, y1, x2, y2):
+        """Return the indices of all vertices within the rectangle with corners (x1, y1) and (x2, y2)."""
+        if self.positions is None or not len(self.positions):
+            return np.zeros(0, dtype=np.int64)
+        if self._stale:
+            self._refresh()
+
+        low = np.minimum((x1, y1), (x2, y2))
+        high = np.maximum((x1, y1), (x2, y2))
+        (col_1, row_1), (col_2, row_2) = self._clip(self._raw_cells(np.array([low, high])))
+
+        starts, cols = self._starts, self._cols
+        candidates = np.concatenate([self.order[starts[row * cols + col_1]: starts[row * cols + col_2 + 1]]
+                                     for row in range(row_1, row_2 + 1)])
+
+        points = self.positions[candidates]
+        return candidates[np.all((low <= points) & (points <= high), axis=1)]
@@ -0,0 +1,114 @@
+"""
+A graph_tool Graph that notifies observers when vertices or edges are added or removed, or property values are
+reported changed.
+"""
+from graph_tool import Graph
+import numpy as np
+
+
+class ObservableGraph(Graph):
+    """
+    Observers are any objects subscribed with `subscribe`; they may implement any of these methods:
+
+        vertex_added(vertex)            -- after the vertex is added
+        vertex_removed(index, last)     -- after the vertex at `index` is removed; the vertex that had index `last` now
+                                           has index `index` (vertex removal is always fast)
+        edge_added(edge)                -- after the edge is added
+        edge_removed(edge)              -- before the edge is removed, so that it's still valid
+        edges_added(edge_list)          -- after `add_edge_list`; `edge_list` is an (n, 2) array of sources and targets
+        edges_removed(edge_list)        -- before `remove_edge_list` removes the edges; `edge_list` is an (n, 3) array
+                                           of their sources, targets and edge indices
+        values_changed(vertices, edges) -- after `values_changed`; arrays of vertex and edge indices whose property
+                                           values changed
+
+    Property maps aren't observable: observers only see the value changes reported with `values_changed`.
+
+    A vertex's edges are removed (and observed) one at a time before the vertex itself is removed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.observers = []
+        super().__init__(*args, **kwargs)
+
+    def subscribe(self, observer):
+        self.observers.append(observer)
+
+    def unsubscribe(self, observer):
+        self.observers.remove(observer)
+
+    def _notify(self, event, *args):
+        for observer in self.observers:
+            if (method := getattr(observer, event, None)) is not None:
+                method(*args)
+
+    def add_vertex(self, n=1):
+        vertices = super().add_vertex(n)
+        if n == 1:
+            self._notify('vertex_added', vertices)
+        else:
+            vertices = list(vertices)
+            for vertex in vertices:
+                self._notify('vertex_added', vertex)
+        return vertices
+
+    def remove_vertex(self, vertex, fast=True):
+        for edge in set(vertex.all_edges()):
+            self.remove_edge(edge)
+
+        index = int(vertex)
+        last = self.num_vertices() - 1
+        super().remove_vertex(vertex, fast=True)  # Observers rely on fast=True, we ignore the previous fast value
+        self._notify('vertex_removed', index, last)
+
+    def add_edge(self, *args, **kwargs):
+        edge = super().add_edge(*args, **kwargs)
+        self._notify('edge_added', edge)
+        return edge
+
+    def remove_edge(self, edge):
+        self._notify('edge_removed', edge)
+        super().remove_edge(edge)
+
+    def add_edge_list(self, edge_list, *args, **kwargs):
+        super().add_edge_list(edge_list, *args, **kwargs)
+        if self.observers:
+            self._notify('edges_added', np.asarray(edge_list)[:, :2].astype(np.int64))
+
+    def remove_edge_list(self, edge_list):
+        """
+        Remove an edge for each (source, target) pair of the (n, 2) `edge_list` (a pair n times removes n parallel
+        edges).  Edges are matched to pairs with NumPy and removed with one edge filter and `purge_edges`, rather
+        than looked up and removed one at a time.
+        """
+        pairs = np.asarray(edge_list, dtype=np.int64).reshape(-1, 2)
+        if not len(pairs):
+            return
+
+        n = self.num_vertices()
+        edges = self.get_edges([self.edge_index])
+        order = np.argsort(edges[:, 0] * n + edges[:, 1], kind='stable')
+        keys = edges[order, 0] * n + edges[order, 1]
+        rank = np.arange(len(keys)) - np.searchsorted(keys, keys)  # Among the edges with the same pair
+
+        wanted, counts = np.unique(pairs[:, 0] * n + pairs[:, 1], return_counts=True)
+        index = np.minimum(np.searchsorted(wanted, keys), len(wanted) - 1)
+        removed = edges[order[(wanted[index] == keys) & (rank < counts[index])]]
+        if len(removed) != len(pairs):
+            raise ValueError('edge_list has pairs that are not edges of the graph')
+
+        if self.observers:
+            self._notify('edges_removed', removed)
+
+        keep = self.new_edge_property('bool', val=True)
+        keep.a[removed[:, 2]] = False
+        self.set_edge_filter(keep)
+        self.purge_edges()
+        self.clear_filters()
+
+    def values_changed(self, vertices=(), edges=()):
+        """Report that property values of the given vertices and edges (descriptors or indices) changed."""
+        if self.observers:
+            vertices = np.fromiter(map(int, vertices), dtype=np.int64)
+            edges = np.fromiter((edge if isinstance(edge, (int, np.integer)) else self.edge_index[edge]
+                                 for edge in edges), dtype=np.int64)
+            self._notify('values_changed', vertices, edges)
@@ -0,0 +1,39 @@
+"""
+Random graphs, generated with NumPy and added to a graph in one go.
+"""
+from graph_tool import Graph
+from graph_tool.topology import extract_largest_component
+import numpy as np
+
+
+def erdos_random_graph(nodes, edges, prune=True, self_loops=False, parallel_edges=False, rng=None):
+    """
+    Directed graph with `edges` edges between uniformly random pairs of `nodes` nodes, generated as arrays and added
+    in one `add_edge_list`.  If `prune`, only the largest (weakly) connected component is kept.  `rng` is a NumPy
+    Generator or a seed.
+    """
+    rng = np.random.default_rng(rng)
+    others = max(nodes if self_loops else nodes - 1, 0)  # Possible targets of each source
+    pairs = nodes * others
+    if edges and (not pairs or edges > pairs and not parallel_edges):
+        raise ValueError(f'{nodes} nodes can have at most {pairs} edges without parallel edges')
+
+    if not edges:
+        sources = targets = np.zeros(0, dtype=np.int64)
+    elif parallel_edges:
+        sources = rng.integers(nodes, size=edges)
+        targets = rng.integers(others, size=edges)
+    else:
+        pairs = rng.choice(pairs, size=edges, replace=False)  # Sampled without a permutation of all pairs
+        sources, targets = np.divmod(pairs, max(others, 1))
+
+    if not self_loops:
+        targets += targets >= sources  # Skip over the source.
+
+    G = Graph()
+    G.add_vertex(nodes)
+    G.add_edge_list(np.column_stack((sources, targets)))
+
+    if prune:
+        G = extract_largest_component(G, directed=False, prune=True)
+    return G
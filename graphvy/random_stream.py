@@ -0,0 +1,49 @@
+"""
+Seeded random numbers for rules and the canvas, so that runs can be reproduced and compared.
+"""
+from bisect import bisect
+from itertools import accumulate
+
+import numpy as np
+
+BATCH = 4096  # uniforms drawn at a time
+
+
+class RandomStream:
+    """
+    The part of `random.Random` that rules use, drawn from a NumPy Generator, `rng`.  Single draws from a Generator
+    are slow, so uniforms are drawn `batch` at a time; code that wants whole arrays of draws can use `rng` directly.
+
+    `seed` is anything np.random.default_rng takes: None (unseeded), an int, a SeedSequence or a Generator.
+    """
+    __slots__ = 'rng', 'batch', '_uniforms'
+
+    def __init__(self, seed=None, batch=BATCH):
+        self.rng = np.random.default_rng(seed)
+        self.batch = batch
+        self._uniforms = []
+
+    def random(self):
+        """Uniform float in [0, 1)."""
+        if not self._uniforms:
+            self._uniforms = self.rng.random(self.batch).tolist()
+        return self._uniforms.pop()
+
+    def randrange(self, n):
+        """Uniform int in [0, n)."""
+        return int(self.random() * n)
+
+    def choice(self, sequence):
+        return sequence[int(self.random() * len(sequence))]
+
+    def choices(self, population, weights):
+        """A list of one item of `population`, chosen with probability proportional to its weight."""
+        cum_weights = list(accumulate(weights))
+        return [population[bisect(cum_weights, self.random() * cum_weights[-1], 0, len(population) - 1)]]
+
+    def seed(self):
+        """A seed for a new, independent stream."""
+        return int(self.rng.integers(2 ** 63))
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.rng!r})'
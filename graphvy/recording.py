@@ -0,0 +1,362 @@
+"""
+Recordings of a graph's history: a log of binary deltas with periodic keyframes, in a directory:
+
+    header.json        -- format version and the recorded properties (kind, name and value type)
+    deltas.bin         -- fixed-size RECORDs, one per vertex or edge addition or removal or property change
+    keyframes.bin      -- (step, record) int64 pairs: keyframe_{step}.gt is the graph after the first `record` records
+    keyframe_{step}.gt
+
+Each record is tagged with the rule step it was made in, so the graph after t steps is a keyframe at or before t with
+the following records of steps before t applied.  Records are in step order.
+"""
+import json
+import os
+
+import graph_tool as gt
+import numpy as np
+
+VERSION = 1
+
+RECORD = np.dtype([('step', '<i8'),   # rule step the change was made in
+                   ('op', 'u1'),      # one of the operations below
+                   ('key', 'u1'),     # index of the property in the header, for SET_VERTEX and SET_EDGE
+                   ('a', '<i4'),      # vertex, or edge source
+                   ('b', '<i4'),      # edge target, or for REMOVE_VERTEX the vertex that took the removed one's index
+                   ('value', '<f8')])  # property value
+
+ADD_VERTEX, REMOVE_VERTEX, ADD_EDGE, REMOVE_EDGE, SET_VERTEX, SET_EDGE = range(6)
+
+KEYFRAME_EVERY = 50_000  # steps between keyframes
+EXCLUDED_PROPERTIES = 'pos', 'pinned'  # Layout and canvas state, not the simulation's
+
+
+class Recorder:
+    """
+    Observes an ObservableGraph and appends its changes to a recording at `path` (a directory, created if needed).
+
+    Additions and removals are recorded as they're observed.  Property maps aren't observable, so the scalar vertex
+    and edge property values of the vertices and edges added in a step (and new properties) are recorded right after
+    the step.  Other property changes (e.g., to an existing edge) are found at `flush` by comparing the values of the
+    vertices and edges reported with G.values_changed since the last flush with their previous values, and recorded
+    as made in the step before it.  Unreported changes (e.g., made in the console) are only found by comparing all
+    values, when a keyframe is written and on `close`.  Wrap the rule with `recording` so that each call counts as a
+    step, and `flush` regularly (the canvas flushes once per frame); a keyframe is written every `keyframe_every`
+    steps.
+    """
+
+    def __init__(self, G, path, keyframe_every=KEYFRAME_EVERY):
+        self.G = G
+        self.path = path
+        self.keyframe_every = keyframe_every
+
+        self.steps = 0
+        self.records = 0  # Written to deltas.bin
+        self._last_step = 0  # Of the last record
+        self._buffer = []  # Records as tuples
+        self._chunks = []  # Records as arrays, with the buffer flushed to a chunk before each
+
+        self._properties = []  # (kind, name) of each recorded property; a record's key indexes this list
+        self._previous = []    # Property arrays as of the last flush, or None for properties not recorded yet
+
+        # Edge index -> (source, target), or -1s for no edge.  Needed to record property changes of edges by endpoints.
+        self._endpoints = np.full((max(G.edge_index_range, 1), 2), -1, dtype=np.int64)
+        edges = G.get_edges([G.edge_index])
+        self._endpoints[edges[:, 2]] = edges[:, :2]
+        self._added_vertices = []  # Added since their values were last recorded
+        self._added_edges = []  # Edge indices, as for _added_vertices
+        self._changed_vertices = []  # Arrays of vertices reported changed since the last flush
+        self._changed_edges = []  # Arrays of edge indices, as for _changed_vertices
+
+        os.makedirs(path, exist_ok=True)
+        self._deltas = open(os.path.join(path, 'deltas.bin'), 'wb')
+        self._keyframes = open(os.path.join(path, 'keyframes.bin'), 'wb')
+
+        self._scan_properties()
+        self._previous = [self._property(kind, name).a.copy() for kind, name in self._properties]  # In keyframe 0
+        self._write_header()
+        self._write_keyframe()
+        G.subscribe(self)
+
+    def recording(self, rule):
+        """Return a function that calls `rule` and counts the call as a step."""
+        def step():
+            rule()
+            if self._added_vertices or self._added_edges:
+                self._record_added()
+            self.steps += 1
+        return step
+
+    def _add(self, op, a, b=-1, key=0, value=0.0):
+        self._buffer.append((self.steps, op, key, a, b, value))
+        self._last_step = self.steps
+
+    def _add_array(self, records):
+        if self._buffer:
+            self._chunks.append(np.array(self._buffer, dtype=RECORD))
+            self._buffer = []
+        self._chunks.append(records)
+        if len(records):
+            self._last_step = records['step'][-1]
+
+    def vertex_added(self, vertex):
+        self._add(ADD_VERTEX, int(vertex))
+        self._added_vertices.append(int(vertex))
+
+    def vertex_removed(self, index, last):
+        self._add(REMOVE_VERTEX, index, last)
+        if index == last:
+            return
+
+        # Edges of the moved vertex have a new endpoint, and its values and pending changes a new index.
+        edges = self.G.get_all_edges(index, [self.G.edge_index])
+        self._endpoints[edges[:, 2]] = edges[:, :2]
+        for (kind, _), previous in zip(self._properties, self._previous):
+            if kind == 'v' and previous is not None and last < len(previous):
+                previous[index] = previous[last]
+        self._added_vertices = [index if vertex == last else vertex for vertex in self._added_vertices]
+        self._changed_vertices = [np.where(vertices == last, index, vertices) for vertices in self._changed_vertices]
+
+    def edge_added(self, edge):
+        source, target = int(edge.source()), int(edge.target())
+        index = self.G.edge_index[edge]
+        if index >= len(self._endpoints):
+            self._endpoints = np.concatenate((self._endpoints, np.full_like(self._endpoints, -1)))
+
+        self._endpoints[index] = source, target
+        self._added_edges.append(index)
+        self._add(ADD_EDGE, source, target)
+
+    def edge_removed(self, edge):
+        self._endpoints[self.G.edge_index[edge]] = -1
+        self._add(REMOVE_EDGE, int(edge.source()), int(edge.target()))
+
+    def edges_removed(self, edge_list):
+        self._endpoints[edge_list[:, 2]] = -1
+        records = np.zeros(len(edge_list), dtype=RECORD)
+        records['step'] = self.steps
+        records['op'] = REMOVE_EDGE
+        records['a'], records['b'] = edge_list[:, :2].T
+        self._add_array(records)
+
+    def edges_added(self, edge_list):
+        records = np.zeros(len(edge_list), dtype=RECORD)
+        records['step'] = self.steps
+        records['op'] = ADD_EDGE
+        records['a'], records['b'] = edge_list.T
+        self._add_array(records)
+
+        edges = self.G.get_edges([self.G.edge_index])
+        old = self._endpoints
+        self._endpoints = np.full((max(self.G.edge_index_range, len(old)), 2), -1, dtype=np.int64)
+        self._endpoints[edges[:, 2]] = edges[:, :2]
+
+        indices = edges[:, 2]
+        is_new = indices >= len(old)
+        is_new[~is_new] = old[indices[~is_new], 0] < 0
+        self._added_edges.extend(indices[is_new].tolist())
+
+    def values_changed(self, vertices, edges):
+        self._changed_vertices.append(vertices)
+        self._changed_edges.append(edges)
+
+    def _property(self, kind, name):
+        return (self.G.vp if kind == 'v' else self.G.ep).get(name)
+
+    def _scan_properties(self):
+        """Start recording any new scalar properties."""
+        known = set(self._properties)
+        new = [(kind, name)
+               for kind, properties in (('v', self.G.vp), ('e', self.G.ep))
+               for name, property_ in properties.items()
+               if (kind, name) not in known and name not in EXCLUDED_PROPERTIES and property_.a is not None]
+        if not new:
+            return
+
+        if len(self._properties) + len(new) > np.iinfo(RECORD['key']).max + 1:
+            raise ValueError('too many properties to record')
+
+        for kind, name in new:
+            self._properties.append((kind, name))
+            self._previous.append(None)  # New properties are recorded in full at the next flush.
+        self._write_header()
+
+    def _write_header(self):
+        with open(os.path.join(self.path, 'header.json'), 'w') as file:
+            properties = [(kind, name, self._property(kind, name).value_type()) for kind, name in self._properties]
+            json.dump(dict(version=VERSION, directed=self.G.is_directed(), record=RECORD.descr,
+                           properties=properties), file)
+
+    def _add_values(self, step, op, key, indices, values):
+        """Add SET_VERTEX or SET_EDGE records of the values of vertices or edges (by index)."""
+        if not len(indices):
+            return
+
+        records = np.zeros(len(indices), dtype=RECORD)
+        records['step'] = step
+        records['op'] = op
+        records['key'] = key
+        if op == SET_VERTEX:
+            records['a'], records['b'] = indices, -1
+        else:
+            records['a'], records['b'] = self._endpoints[indices].T
+        records['value'] = values
+        self._add_array(records)
+
+    def _record_added(self):
+        """Record the property values of vertices and edges added since the last step, as made in this step."""
+        self._scan_properties()
+        vertices = np.unique(np.array(self._added_vertices, dtype=np.int64))
+        edges = np.unique(np.array(self._added_edges, dtype=np.int64))
+        self._added_vertices = []
+        self._added_edges = []
+
+        for key, (kind, name) in enumerate(self._properties):
+            if (property_ := self._property(kind, name)) is None:
+                continue  # Property was removed.
+            if (previous := self._previous[key]) is None:
+                self._record_changes(key, self.steps)  # New property, recorded in full
+                continue
+
+            current = property_.a
+            if kind == 'v':
+                indices, op = vertices[vertices < len(current)], SET_VERTEX
+            else:  # Only edges that still exist.
+                indices, op = edges[edges < min(len(current), len(self._endpoints))], SET_EDGE
+                indices = indices[self._endpoints[indices, 0] >= 0]
+            self._add_values(self.steps, op, key, indices, current[indices])
+
+            # Added items are past the end of `previous` or reuse an index, so they're all that's new in `current`.
+            if len(previous) < len(current):
+                previous = self._previous[key] = np.concatenate((previous, current[len(previous):]))
+            indices = indices[indices < len(previous)]
+            previous[indices] = current[indices]
+
+    def _record_changes(self, key, step, candidates=None):
+        """
+        Record the values of a property that changed since the last flush, as made in `step`.  Only the values of
+        `candidates` (vertex or edge indices) are compared, if given.
+        """
+        kind, name = self._properties[key]
+        if (property_ := self._property(kind, name)) is None:
+            return  # Property was removed.
+
+        current = property_.a
+        previous = self._previous[key]
+        if previous is None:
+            previous = np.zeros(0, dtype=current.dtype)
+            candidates = None  # New property, recorded in full
+        n = min(len(current), len(previous))
+
+        if candidates is None:
+            changed = np.flatnonzero(current[:n] != previous[:n])
+            indices = np.concatenate((changed, np.arange(n, len(current))))  # Also values of new properties
+        else:
+            candidates = candidates[candidates < n]
+            indices = candidates[current[candidates] != previous[candidates]]
+
+        if kind == 'v':
+            op = SET_VERTEX
+        else:
+            indices = indices[indices < len(self._endpoints)]
+            indices, op = indices[self._endpoints[indices, 0] >= 0], SET_EDGE  # Only edges that exist
+        self._add_values(step, op, key, indices, current[indices])
+
+        if candidates is None:
+            self._previous[key] = current.copy()
+        else:
+            previous[candidates] = current[candidates]
+
+    def _record_properties(self, full=False):
+        """Record property changes: of the reported vertices and edges, or if `full`, of all of them."""
+        self._record_added()  # Of user edits since the last step
+        step = max(self.steps - 1, self._last_step)  # Other changes were made during the last step (or user edit).
+
+        vertices = edges = None
+        if not full:
+            vertices = np.unique(np.concatenate(self._changed_vertices or [np.zeros(0, dtype=np.int64)]))
+            edges = np.unique(np.concatenate(self._changed_edges or [np.zeros(0, dtype=np.int64)]))
+        self._changed_vertices = []
+        self._changed_edges = []
+
+        for key, (kind, _) in enumerate(self._properties):
+            self._record_changes(key, step, vertices if kind == 'v' else edges)
+
+    def flush(self):
+        """Record reported property changes, write buffered records and, if it's due, a keyframe."""
+        self._record_properties()
+        self._write_records()
+        if self.steps - self._keyframe_step >= self.keyframe_every:
+            self._write_keyframe()
+
+    def _write_records(self):
+        if self._buffer:
+            self._chunks.append(np.array(self._buffer, dtype=RECORD))
+            self._buffer = []
+
+        for records in self._chunks:
+            self._deltas.write(records.tobytes())
+            self.records += len(records)
+        self._chunks = []
+        self._deltas.flush()
+
+    def _write_keyframe(self):
+        self._record_properties(full=True)
+        self._write_records()
+
+        self.G.save(os.path.join(self.path, f'keyframe_{self.steps}.gt'), fmt='gt')
+        self._keyframes.write(np.array([self.steps, self.records], dtype='<i8').tobytes())
+        self._keyframes.flush()
+        self._keyframe_step = self.steps
+
+    def close(self):
+        """Stop observing G and write everything recorded."""
+        self.G.unsubscribe(self)
+        self._record_properties(full=True)
+        self.flush()
+        self._deltas.close()
+        self._keyframes.close()
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.path!r}, steps={self.steps}, records={self.records})'
+
+
+class Recording:
+    """
+    A recording opened for playback.  Deltas are memory-mapped, so opening a recording is fast whatever its size.
+    Recordings that weren't closed (e.g., the app crashed) can be read up to their last complete record.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(os.path.join(path, 'header.json')) as file:
+            header = json.load(file)
+        if header['version'] != VERSION:
+            raise ValueError(f'unsupported recording version {header["version"]}')
+        self.properties = [tuple(property_) for property_ in header['properties']]  # (kind, name, value type)
+
+        deltas = os.path.join(path, 'deltas.bin')
+        n = os.path.getsize(deltas) // RECORD.itemsize
+        self.deltas = np.memmap(deltas, dtype=RECORD, mode='r', shape=(n,)) if n else np.zeros(0, dtype=RECORD)
+
+        keyframes = np.fromfile(os.path.join(path, 'keyframes.bin'), dtype='<i8')
+        self.keyframe_steps, self.keyframe_records = keyframes[:len(keyframes) // 2 * 2].reshape(-1, 2).T
+
+        self.steps = int(max(self.keyframe_steps[-1], self.deltas['step'][-1] + 1 if n else 0))
+
+    def records_before(self, step):
+        """Number of records of steps before `step`."""
+        return int(np.searchsorted(self.deltas['step'], step, side='left'))
+
+    def keyframe_before(self, step):
+        """Index of the last keyframe at or before `step`."""
+        return max(int(np.searchsorted(self.keyframe_steps, step, side='right')) - 1, 0)
+
+    def load_keyframe(self, index):
+        return gt.load_graph(os.path.join(self.path, f'keyframe_{self.keyframe_steps[index]}.gt'), fmt='gt')
+
+    def __len__(self):
+        return self.steps
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.path!r}, steps={self.steps}, records={len(self.deltas)})'
@@ -1,6 +1,13 @@
 from functools import partial
 from itertools import islice, chain
-from random import choice, choices, randrange as randint
+
+import numpy as np
+
+from .edge_index import EdgeIndex
+from .out_edges import OutEdges
+from ...random_stream import RandomStream
+
+MIN_WINDOW = 64  # moves evaluated at once by step_batch, at least
 
 
 def nth(iterator, n):
@@ -9,23 +16,45 @@ def nth(iterator, n):
 
 
 class AsyncDynamicBase:
-    """Asynchronous graphs update nodes/edges randomly."""
+    """
+    Asynchronous graphs update nodes/edges randomly.  All random draws are from `self.random`, a RandomStream seeded
+    with `rng` (None, an int or a NumPy Generator), so a run can be reproduced by seeding it.
+    """
 
-    __slots__ = 'G', 'niter'
+    __slots__ = 'G', 'niter', 'edge_index', 'random'
 
-    def __init__(self, G, *, niter=1):
+    def __init__(self, G, *, niter=1, rng=None):
         self.G = G  # Graph
         self.niter = niter  # Default iterations for self.update
+        self.random = RandomStream(rng)
+
+        # Observable graphs (e.g., the canvas's GraphInterface) let us keep a dense edge index for O(1) sampling.
+        self.edge_index = EdgeIndex(G) if hasattr(G, 'subscribe') else None
+
+    def close(self):
+        """Stop tracking G."""
+        if self.edge_index is not None:
+            self.edge_index.close()
+
+    def values_changed(self, vertices=(), edges=()):
+        """
+        Report property values of existing vertices and edges the rule changed to G's observers (e.g., a Recorder),
+        if G is observable.  Values of added vertices and edges needn't be reported.
+        """
+        if self.edge_index is not None:
+            self.G.values_changed(vertices, edges)
 
     @property
     def rv(self):
         """Choose a random vertex from G."""
-        return self.G.vertex(randint(G.num_vertices()))
+        return self.G.vertex(self.random.randrange(self.G.num_vertices()))  # Vertex indices are contiguous
 
     @property
     def re(self):
         """Choose a random edge from G."""
-        return self.G.edge(*nth(self.G.iter_edges(), randint(self.G.num_edges())))
+        if self.edge_index is None:
+            return self.G.edge(*nth(self.G.iter_edges(), self.random.randrange(self.G.num_edges())))
+        return self.edge_index.edge(self.random.randrange(len(self.edge_index)))
 
     def update(self):
         """Apply self.step niter times."""
@@ -36,6 +65,15 @@ class AsyncDynamicBase:
         """A single iteration of graph dynamics."""
         raise NotImplementedError
 
+    def step_batch(self, k):
+        """
+        k iterations of graph dynamics.  Rules may override this with a vectorized version that has the same
+        dynamics; the default calls self.step k times.  Returns k.
+        """
+        for _ in range(k):
+            self.step()
+        return k
+
     def __call__(self):
         """Alternative method of stepping."""
         return self.step()
@@ -44,25 +82,37 @@ class AsyncDynamicBase:
 class GASEPBase(AsyncDynamicBase):
     """Mix-in for Dynamic Graphs."""
 
+    def out_neighbor(self, vertex, n):
+        """The nth out-neighbor of vertex, in no particular order.  O(1) with an edge index."""
+        if self.edge_index is None:
+            return nth(vertex.out_neighbors(), n)
+        return self.edge_index.out_neighbor(int(vertex), n)
+
+    def has_edge(self, source, target):
+        """Whether G has an edge from source to target.  O(1) with an edge index."""
+        if self.edge_index is None:
+            return self.G.edge(source, target) is not None
+        return self.edge_index.has_edge(int(source), int(target))
+
     def head_move(self, out_deg, source, target, multigraph=False):
         """Move source along an out_edge if possible."""
-        new_source = nth(source.out_neighbors(), randint(out_deg))
+        new_source = self.out_neighbor(source, self.random.randrange(out_deg))
 
-        if multigraph or self.G.edge(new_source, target) is None:
+        if multigraph or not self.has_edge(new_source, target):
             self.G.add_edge(new_source, target)
             return True
 
     def tail_move(self, out_deg, source, target, multigraph=False):
         """Move target along an out_edge if possible."""
-        new_target = nth(target.out_neighbors(), randint(out_deg))
+        new_target = self.out_neighbor(target, self.random.randrange(out_deg))
 
-        if multigraph or self.G.edge(source, new_target) is None:
+        if multigraph or not self.has_edge(source, new_target):
             self.G.add_edge(source, new_target)
             return True
 
     def flip(self, source, target, multigraph=False):
         """Flip an edge if the flipped edge doesn't exist."""
-        if multigraph or self.G.edge(target, source) is None:
+        if multigraph or not self.has_edge(target, source):
             self.G.add_edge(target, source)
             return True
 
@@ -89,11 +139,89 @@ class EdgeCentricGASEP(GASEPBase):
 
         head = partial(self.head_move, source_out)
         tail = partial(self.tail_move, target_out)
-        move, = choices((head, tail), (source_out, target_out))
+        move, = self.random.choices((head, tail), (source_out, target_out))
 
         if not move(source, target):
             self.G.add_edge(source, target)
 
+    def step_batch(self, k):
+        """
+        k steps, vectorized.  Moves are drawn with NumPy and evaluated a window at a time on an OutEdges copy of
+        the edges, all against the same state.  Each move reads the out-edges of its edge's endpoints and of the new
+        source, and an accepted move changes the out-edges of its old and new source: the moves before the first
+        that reads out-edges an earlier accepted move changed are exactly what step would do one at a time, so they
+        are applied and the rest of the window is evaluated again.  The changed edges are then removed from G with
+        one remove_edge_list and added back moved with one add_edge_list.
+        """
+        if self.edge_index is None or not len(self.edge_index) or not k:
+            return super().step_batch(k)
+
+        edges = OutEdges(self.edge_index, self.G.num_vertices())
+        original = np.stack((edges.source, edges.target), axis=1)
+        moved = np.zeros(len(original), dtype=bool)
+
+        rng = self.random.rng
+        picks = rng.integers(len(original), size=k)  # Row of each move's edge; the rule keeps the number of edges.
+        uniforms = rng.random(k)
+
+        done = 0
+        window = MIN_WINDOW
+        while done < k:
+            rows = picks[done:done + window]
+            u = uniforms[done:done + window]
+            source, target = edges.source[rows], edges.target[rows]
+            loop = source == target
+
+            # Out-degrees without the picked edge.
+            source_out = edges.count[source] - 1
+            target_out = edges.count[target] - loop
+            total = source_out + target_out
+            possible = total > 0
+
+            # As step: a head move with probability source_out / total, to a uniformly random out-neighbor.
+            choice = np.minimum((u * total).astype(np.int64), np.maximum(total - 1, 0))
+            head = choice < source_out
+            vertex = np.where(head, source, target)
+            n = np.where(head, choice, choice - source_out)
+            n += (head | loop) & (n >= edges.position(rows))  # Skip the picked edge, if it's in vertex's block.
+            neighbor = edges.target[edges.nth(vertex, np.where(possible, n, 0))]
+
+            new_source = np.where(head, neighbor, source)
+            new_target = np.where(head, target, neighbor)
+            accepted = possible.copy()
+            accepted[possible] = ~edges.has_edge(new_source[possible], new_target[possible], rows[possible])
+
+            # Moves read the blocks of source, target and new_source; accepted moves change source's and new_source's.
+            movers = np.flatnonzero(accepted)
+            writes = np.concatenate((source[movers], new_source[movers]))
+            writers = np.concatenate((movers, movers))
+            order = np.lexsort((writers, writes))
+            written, first = np.unique(writes[order], return_index=True)
+            first_writer = writers[order][first]
+
+            reads = np.stack((source, target, new_source))
+            index = np.minimum(np.searchsorted(written, reads), max(len(written) - 1, 0))
+            if len(written):
+                stale = ((written[index] == reads) & (first_writer[index] < np.arange(len(rows)))).any(axis=0)
+            else:
+                stale = np.zeros(len(rows), dtype=bool)
+            applied = stale.argmax() if stale.any() else len(rows)
+
+            movers = movers[movers < applied]
+            edges.set_sources(rows[movers], new_source[movers])
+            edges.target[rows[movers]] = new_target[movers]
+            moved[rows[movers]] = True
+
+            done += applied
+            window = max(2 * applied, MIN_WINDOW)
+
+        rows = np.flatnonzero(moved)
+        old, new = original[rows], np.stack((edges.source[rows], edges.target[rows]), axis=1)
+        changed = (old != new).any(axis=1)
+        self.G.remove_edge_list(old[changed])
+        self.G.add_edge_list(new[changed])
+        return k
+
 
 class EdgeFlipGASEP(GASEPBase):
     """Same as EdgeCentricGASEP, but with one extra move(edges can flip orientation)."""
@@ -110,7 +238,7 @@ class EdgeFlipGASEP(GASEPBase):
 
         head = partial(self.head_move, source_out)
         tail = partial(self.tail_move, target_out)
-        move, = choices((head, tail, self.flip), (source_out, target_out, 1))
+        move, = self.random.choices((head, tail, self.flip), (source_out, target_out, 1))
 
         if not move(source, target):
             self.G.add_edge(source, target)
@@ -137,6 +265,8 @@ class Gravity(GASEPBase):
         if 'flavors' not in self.G.ep:
             self.flavors = self.G.new_edge_property('int')
             self.G.ep.flavors = self.flavors
+        else:  # e.g., each process of an ensemble loads a graph that already has flavors
+            self.flavors = self.G.ep.flavors
 
         self.dynamics = self.photon_dynamics, self.matter_dynamics, self.antimatter_dynamics
 
@@ -153,7 +283,7 @@ class Gravity(GASEPBase):
 
         head = partial(self.head_move, source_out)
         tail = partial(self.tail_move, target_out)
-        move, = choices((head, tail), (source_out, target_out))
+        move, = self.random.choices((head, tail), (source_out, target_out))
 
         if not move(source, target):
             self.G.add_edge(source, target)
@@ -166,6 +296,7 @@ class Gravity(GASEPBase):
         if (e := self.G.edge(t, s)) and self.flavors[e] == PHOTON:
             self.flavors[e] = MATTER
             self.flavors[self.particle] = ANTIMATTER
+            self.values_changed(edges=(e, self.particle))
             return True
         return False
 
@@ -174,6 +305,7 @@ class Gravity(GASEPBase):
         if (e := self.G.edge(t, s)) and self.flavors[e] == ANTIMATTER:
             self.flavors[e] = PHOTON
             self.flavors[self.particle] = PHOTON
+            self.values_changed(edges=(e, self.particle))
             return True
         return False
 
@@ -184,18 +316,18 @@ class Gravity(GASEPBase):
         if not photons:
             return False
 
-        photon = source, target = choice(photons)
+        photon = source, target = self.random.choice(photons)
         G = self.G
         flavors = self.flavors
 
         G.remove_edge(photon)
         for edge in list(target.out_edges()):
-            if not G.edge(source, edge.target()):
+            if not self.has_edge(source, edge.target()):
                 e = G.add_edge(source, edge.target())
                 flavors[e] = flavors[edge]
             G.remove_edge(edge)
         for edge in list(target.in_edges()):
-            if not G.edge(edge.source(), source):
+            if not self.has_edge(edge.source(), source):
                 e = G.add_edge(edge.source(), source)
                 flavors[e] = flavors[edge]
             G.remove_edge(edge)
@@ -203,7 +335,7 @@ class Gravity(GASEPBase):
         return True
 
     def expand_space(self):
-        end_to_cleave = choice(tuple(self.particle))
+        end_to_cleave = self.random.choice(tuple(self.particle))
 
         s, t = self.particle
         G = self.G
@@ -211,12 +343,12 @@ class Gravity(GASEPBase):
 
         new_node = G.add_vertex(1)
         for edge in list(end_to_cleave.in_edges()):
-            if randint(2):
+            if self.random.randrange(2):
                 e = G.add_edge(edge.source(), new_node)
                 flavors[e] = flavors[edge]
                 G.remove_edge(edge)
         for edge in list(end_to_cleave.out_edges()):
-            if randint(2):
+            if self.random.randrange(2):
                 e = G.add_edge(new_node, edge.target())
                 flavors[e] = flavors[edge]
                 G.remove_edge(edge)
@@ -224,8 +356,8 @@ class Gravity(GASEPBase):
         flavors[e] = PHOTON
 
     def emit_photon(self):
-        end = choice(tuple(self.particle))
-        if not self.G.edge(end, end):
+        end = self.random.choice(tuple(self.particle))
+        if not self.has_edge(end, end):
             e = self.G.add_edge(end, end)
             self.flavors[e] = PHOTON
 
@@ -240,7 +372,7 @@ class Gravity(GASEPBase):
         if not photons:
             return False
 
-        self.G.remove_edge(choice(photons))
+        self.G.remove_edge(self.random.choice(photons))
         return True
 
     def photon_dynamics(self):
@@ -0,0 +1,136 @@
+"""
+A dense index of the edges of an ObservableGraph for O(1) uniform edge sampling, out-neighbor sampling and edge lookup.
+"""
+import numpy as np
+
+
+class EdgeIndex:
+    """
+    Keeps the (source, target) pair of every edge in the first `len(self)` rows of `self.pairs`.  Removed edges are
+    swapped with the last row, so the rows stay dense and a uniformly random row is a uniformly random edge.
+
+    The targets of each vertex's out-edges are kept in a list, `out`, the same way: a removed target is swapped with
+    the last, so the nth out-neighbor of a vertex and whether an edge exists are O(1) whatever the vertex's degree.
+
+    Subscribes itself to G, so rule moves and edits made through the canvas are both tracked.  Parallel edges each
+    get a row, but `edge` can't tell them apart.
+    """
+
+    def __init__(self, G):
+        self.G = G
+
+        edges = G.get_edges()[:, :2]
+        self.size = len(edges)
+        self.pairs = np.zeros((max(2 * self.size, 16), 2), dtype=np.int64)
+        self.pairs[:self.size] = edges
+
+        self.rows = {}  # (source, target) -> list of rows with that pair
+        self.out = {}  # source -> targets of its out-edges, for sources with out-edges
+        self.positions = {}  # (source, target) -> positions of target in self.out[source]
+        for row, pair in enumerate(map(tuple, edges.tolist())):
+            self.rows.setdefault(pair, []).append(row)
+            self._add_out(*pair)
+
+        G.subscribe(self)
+
+    def close(self):
+        """Stop tracking G."""
+        self.G.unsubscribe(self)
+
+    def __len__(self):
+        return self.size
+
+    def edge(self, row):
+        """Return the edge descriptor of the given row."""
+        return self.G.edge(*self.pairs[row].tolist())
+
+    def has_edge(self, source, target):
+        return (source, target) in self.rows
+
+    def out_degree(self, vertex):
+        return len(self.out.get(vertex, ()))
+
+    def out_neighbor(self, vertex, n):
+        """The nth out-neighbor of vertex, in no particular order."""
+        return self.out[vertex][n]
+
+    def add(self, source, target):
+        if self.size == len(self.pairs):
+            self.pairs = np.concatenate((self.pairs, np.zeros_like(self.pairs)))
+
+        self.pairs[self.size] = source, target
+        self.rows.setdefault((source, target), []).append(self.size)
+        self.size += 1
+        self._add_out(source, target)
+
+    def remove(self, source, target):
+        rows = self.rows[source, target]
+        row = rows.pop()
+        if not rows:
+            del self.rows[source, target]
+
+        self.size = last = self.size - 1
+        if row != last:  # Move the last pair into the freed row.
+            pair = self.pairs[row] = self.pairs[last]
+            moved = self.rows[tuple(pair.tolist())]
+            moved[moved.index(last)] = row
+
+        self._remove_out(source, target)
+
+    def _add_out(self, source, target):
+        targets = self.out.setdefault(source, [])
+        self.positions.setdefault((source, target), []).append(len(targets))
+        targets.append(target)
+
+    def _remove_out(self, source, target):
+        targets = self.out[source]
+        positions = self.positions[source, target]
+        position = positions.pop()
+        if not positions:
+            del self.positions[source, target]
+
+        last = len(targets) - 1
+        if position != last:  # Move the last target into the freed position.
+            targets[position] = targets[last]
+            moved = self.positions[source, targets[position]]
+            moved[moved.index(last)] = position
+
+        targets.pop()
+        if not targets:
+            del self.out[source]
+
+    # --- ObservableGraph observer methods ---
+    def edge_added(self, edge):
+        self.add(int(edge.source()), int(edge.target()))
+
+    def edge_removed(self, edge):
+        self.remove(int(edge.source()), int(edge.target()))
+
+    def edges_added(self, edge_list):
+        for source, target in edge_list.tolist():
+            self.add(source, target)
+
+    def edges_removed(self, edge_list):
+        for source, target, _ in edge_list.tolist():
+            self.remove(source, target)
+
+    def vertex_removed(self, index, last):
+        """The vertex `last` was renumbered to `index`; renumber its pairs too."""
+        if index == last:
+            return
+
+        # The removed vertex had no edges left, so no pair with `index` exists yet.
+        if last in self.out:
+            self.out[index] = self.out.pop(last)
+
+        for source, target in {(int(s), int(t)) for s, t in self.G.vertex(index).all_edges()}:
+            old = last if source == index else source, last if target == index else target
+            rows = self.rows.pop(old)
+            self.rows[source, target] = rows
+            self.pairs[rows] = source, target
+
+            positions = self.positions[source, target] = self.positions.pop(old)
+            if target == index:
+                targets = self.out[source]
+                for position in positions:
+                    targets[position] = index
@@ -0,0 +1,87 @@
+"""
+Arrays of each vertex's out-edges, for rules that apply many moves at once (see AsyncDynamicBase.step_batch).
+"""
+import numpy as np
+
+
+class OutEdges:
+    """
+    A copy of the edges of an EdgeIndex: `source` and `target` are indexed by the EdgeIndex's rows, and the rows of
+    each vertex's out-edges are in a block of `slots`, slots[start[v]:start[v] + count[v]].  Blocks have room to
+    grow; a full block is moved to the end of `slots` with twice the room.
+
+    The copy doesn't track the graph: it's made for a batch of moves, which are applied to the graph afterwards.
+    Updates are vectorized, so one update mustn't touch a vertex's block more than once.
+    """
+
+    def __init__(self, edge_index, vertices):
+        pairs = edge_index.pairs[:len(edge_index)]
+        self.source = pairs[:, 0].copy()
+        self.target = pairs[:, 1].copy()
+
+        self.count = np.bincount(self.source, minlength=vertices)
+        self.room = 2 * self.count + 1
+        self.start = np.cumsum(self.room) - self.room
+        self.end = int(self.room.sum())  # Of the used part of `slots`
+        self.slots = np.full(self.end, -1, dtype=np.int64)
+
+        # Row -> its slot.  Rows are put in their source's block in order.
+        order = np.argsort(self.source, kind='stable')
+        first = np.cumsum(self.count) - self.count  # Rank of each vertex's first row in `order`
+        self.where = np.empty(len(order), dtype=np.int64)
+        self.where[order] = self.start[self.source[order]] + np.arange(len(order)) - first[self.source[order]]
+        self.slots[self.where] = np.arange(len(order))
+
+    def nth(self, vertices, n):
+        """Row of the nth out-edge of each vertex."""
+        return self.slots[self.start[vertices] + n]
+
+    def position(self, rows):
+        """Position of each row in its source's block."""
+        return self.where[rows] - self.start[self.source[rows]]
+
+    def has_edge(self, sources, targets, exclude):
+        """Whether each of `sources` has an out-edge to the matching target, other than the row in `exclude`."""
+        counts = self.count[sources]
+        move = np.repeat(np.arange(len(sources)), counts)
+        slots = np.repeat(self.start[sources] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        rows = self.slots[slots]
+        hits = (self.target[rows] == targets[move]) & (rows != exclude[move])
+        return np.bincount(move[hits], minlength=len(sources)) > 0
+
+    def set_sources(self, rows, sources):
+        """Move rows to the blocks of new sources."""
+        moving = self.source[rows] != sources
+        rows, sources = rows[moving], sources[moving]
+        old = self.source[rows]
+
+        # The last row of each old block takes the moving row's slot.
+        last = self.slots[self.start[old] + self.count[old] - 1]
+        self.slots[self.where[rows]] = last
+        self.where[last] = self.where[rows]
+        self.count[old] -= 1
+
+        if (full := self.count[sources] == self.room[sources]).any():
+            self._grow(sources[full])
+
+        slots = self.start[sources] + self.count[sources]
+        self.slots[slots] = rows
+        self.where[rows] = slots
+        self.count[sources] += 1
+        self.source[rows] = sources
+
+    def _grow(self, vertices):
+        room = 2 * self.room[vertices]
+        start = self.end + np.cumsum(room) - room
+        self.end += int(room.sum())
+        if self.end > len(self.slots):
+            self.slots = np.concatenate((self.slots, np.full(max(self.end, len(self.slots)), -1, dtype=np.int64)))
+
+        for vertex, new in zip(vertices.tolist(), start.tolist()):
+            old, count = self.start[vertex], self.count[vertex]
+            rows = self.slots[old:old + count]
+            self.slots[new:new + count] = rows
+            self.where[rows] = np.arange(new, new + count)
+
+        self.start[vertices] = start
+        self.room[vertices] = room
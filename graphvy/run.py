@@ -0,0 +1,112 @@
+"""
+Run a rule on a graph without the GUI:
+
+    python -m graphvy.run rule.py graph.gt --steps 1000000 --snapshot-every 100000 --out snapshots --seed 0
+
+Snapshots are saved as `.gt` files that can be loaded in Graphvy to inspect the results.
+"""
+from argparse import ArgumentParser
+import os
+import time
+
+import graph_tool as gt
+
+from .observable_graph import ObservableGraph
+from .rules.bases.dynamic_graph import AsyncDynamicBase
+
+REPORT_INTERVAL = 1  # seconds between progress reports
+CHUNK = 1000         # steps between checks of the clock
+
+
+def load_rule(path):
+    """Return `rule` from a rule file.  Rule files may import from graphvy with relative imports."""
+    with open(path, 'r') as code:
+        code = code.read()
+
+    l = {}
+    exec(code, {'__package__': __package__, '__name__': f'{__package__}.rule'}, l)
+    return l['rule']
+
+
+def start_rule(rule, G, seed=None):
+    """Return rule(G), seeded with `seed` if the rule can be (rules based on AsyncDynamicBase can)."""
+    if isinstance(rule, type) and issubclass(rule, AsyncDynamicBase):
+        return rule(G, rng=seed)
+    return rule(G)
+
+
+def load_graph(path):
+    """Load a graph in a form that rules can keep indices of."""
+    G = ObservableGraph(gt.load_graph(path, fmt='gt'))
+    G.set_fast_edge_removal()
+    return G
+
+
+def run(rule_callback, steps, *, snapshot_every=0, snapshot=None, report=None, batch=0):
+    """
+    Call rule_callback `steps` times, or if `batch`, call rule_callback.step_batch with up to `batch` steps at a time.
+    `snapshot(step)` is called every `snapshot_every` steps and `report(step, steps_per_second)` about every
+    REPORT_INTERVAL seconds (or batch, if that's longer).  Returns the overall steps per second.
+    """
+    start = last_report = time.perf_counter()
+    last_step = step = 0
+
+    while step < steps:
+        chunk = min(batch or CHUNK, steps - step)
+        if snapshot_every:
+            chunk = min(chunk, snapshot_every - step % snapshot_every)
+
+        if batch:
+            rule_callback.step_batch(chunk)
+        else:
+            for _ in range(chunk):
+                rule_callback()
+        step += chunk
+
+        if snapshot is not None and snapshot_every and step % snapshot_every == 0:
+            snapshot(step)
+
+        now = time.perf_counter()
+        if report is not None and now - last_report >= REPORT_INTERVAL:
+            report(step, (step - last_step) / (now - last_report))
+            last_step, last_report = step, now
+
+    return steps / max(time.perf_counter() - start, 1e-9)
+
+
+def main():
+    parser = ArgumentParser(prog='python -m graphvy.run', description='Run a Graphvy rule without the GUI.')
+    parser.add_argument('rule', help='py file that defines `rule`')
+    parser.add_argument('graph', help='gt file of the initial graph')
+    parser.add_argument('--steps', type=int, required=True, help='number of rule steps')
+    parser.add_argument('--snapshot-every', type=int, default=0, help='steps between snapshots (default: only last)')
+    parser.add_argument('--out', default='.', help='directory for snapshots')
+    parser.add_argument('--seed', type=int, help='seed of the rule (default: unseeded)')
+    parser.add_argument('--batch', type=int, default=0,
+                        help='steps per call of the rule\'s step_batch (default: step one at a time)')
+    args = parser.parse_args()
+
+    G = load_graph(args.graph)
+    rule_callback = start_rule(load_rule(args.rule), G, args.seed)
+
+    os.makedirs(args.out, exist_ok=True)
+    name = os.path.splitext(os.path.basename(args.graph))[0]
+    width = len(str(args.steps))
+
+    def snapshot(step):
+        G.save(os.path.join(args.out, f'{name}_{step:0{width}d}.gt'), fmt='gt')
+
+    def report(step, steps_per_second):
+        print(f'{step:>{width}}/{args.steps} steps  {steps_per_second:,.0f} steps/s  '
+              f'V={G.num_vertices()} E={G.num_edges()}', flush=True)
+
+    steps_per_second = run(rule_callback, args.steps, snapshot_every=args.snapshot_every, snapshot=snapshot,
+                           report=report, batch=args.batch)
+    if not args.snapshot_every or args.steps % args.snapshot_every:
+        snapshot(args.steps)
+
+    print(f'{args.steps} steps at {steps_per_second:,.0f} steps/s')
+
+
+if __name__ == '__main__':
+    main()
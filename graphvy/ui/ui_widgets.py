@@ -1,6 +1,10 @@
-from kivy.properties import ObjectProperty, StringProperty
+from kivy.clock import Clock
+from kivy.properties import BooleanProperty, ObjectProperty, StringProperty
 from kivy.uix.behaviors import ToggleButtonBehavior
+from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.modalview import ModalView
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 
 from kivymd.uix.behaviors import BackgroundColorBehavior, HoverBehavior
 from kivymd.uix.button import MDFloatingActionButton, MDIconButton, MDRectangleFlatIconButton
@@ -8,36 +12,97 @@ from kivymd.uix.list import OneLineListItem
 from kivymd.uix.menu import MDDropdownMenu
 from kivymd.uix.tooltip import MDTooltip
 
-from ..constants import HIGHLIGHTED_NODE, NODE_COLOR, SELECTED_COLOR
+from ..constants import HIGHLIGHTED_NODE, NODE_COLOR, PLAYBACK_SPEED, SELECTED_COLOR
 
 
-class AdjacencyListItem(OneLineListItem, BackgroundColorBehavior, HoverBehavior):
-    __slots__ = 'node'
+ROW = {}  # Rows hold no data (a row's index is its vertex), so every row can share one dict.
 
-    def __init__(self, node, *args, **kwargs):
-        self.node = node
 
+class AdjacencyList(RecycleView):
+    """
+    Adjacency list of graph_canvas.G.  Only visible rows are materialized; their text and color are computed from
+    the graph when they're shown or refreshed.  While the list isn't shown, its rows aren't even created (laying out
+    millions of rows isn't free): they're caught up when it's shown.
+    """
+    graph_canvas = ObjectProperty(None)
+    is_hidden = BooleanProperty(True)
+    is_selected = BooleanProperty(False)
+
+    _rows = 0  # Rows the list should have
+
+    @property
+    def is_shown(self):
+        return not self.is_hidden and self.is_selected
+
+    def on_is_hidden(self, *args):
+        self._catch_up()
+
+    def on_is_selected(self, *args):
+        self._catch_up()
+
+    def _catch_up(self):
+        if self.is_shown:
+            self.resize(self._rows)
+            self.refresh_from_data()
+
+    def resize(self, n):
+        """Show rows for vertices 0 to n - 1."""
+        self._rows = n
+        if not self.is_shown:
+            return
+
+        if n > len(self.data):
+            self.data.extend([ROW] * (n - len(self.data)))
+        elif n < len(self.data):
+            del self.data[n:]
+
+    def refresh_rows(self, vertices):
+        """Re-render the rows of the given vertices that are visible."""
+        if not self.is_shown:
+            return
+
+        if not isinstance(vertices, (set, frozenset)):
+            vertices = set(vertices)
+
+        for index, view in self.view_adapter.views.items():
+            if index in vertices:
+                view.refresh()
+
+
+class AdjacencyListItem(RecycleDataViewBehavior, OneLineListItem, BackgroundColorBehavior, HoverBehavior):
+    adjacency_list = None
+    vertex = None
+
+    def __init__(self, *args, **kwargs):
         super().__init__(*args,
                          md_bg_color=SELECTED_COLOR,
                          theme_text_color='Custom',
                          text_color=NODE_COLOR, **kwargs)
-        self.update_text()
 
         self.bind(on_release=self._on_release)
 
+    def refresh_view_attrs(self, rv, index, data):
+        self.adjacency_list = rv
+        self.vertex = index
+        self.refresh()
+        return super().refresh_view_attrs(rv, index, data)
+
     def on_enter(self, *args):
-        adjacency_list = self.node.canvas.adjacency_list
+        adjacency_list = self.adjacency_list
         if not adjacency_list.is_hidden and adjacency_list.is_selected:
-            self.node.canvas.highlighted = self.node
+            adjacency_list.graph_canvas.highlighted = self.vertex
 
     def on_leave(self, *args):
         pass
 
     def _on_release(self, *args):
-        self.node.canvas.touch_down_dict[self.node.canvas.tool]()
+        graph_canvas = self.adjacency_list.graph_canvas
+        graph_canvas.touch_down_dict[graph_canvas.tool]()
 
-    def update_text(self):
-        self.text = f'{self.node.vertex}: {", ".join(map(str, self.node.vertex.out_neighbors()))}'
+    def refresh(self):
+        graph_canvas = self.adjacency_list.graph_canvas
+        self.text = f'{self.vertex}: {", ".join(map(str, graph_canvas.G.get_out_neighbors(self.vertex)))}'
+        self.md_bg_color = graph_canvas.list_item_color(self.vertex)
 
 
 class ToolIcon(MDIconButton, ToggleButtonBehavior, MDTooltip):
@@ -87,12 +152,18 @@ class RandomGraphDialogue(ModalView, BackgroundColorBehavior):
 
     def new_random_graph(self, nodes, edges):
         if nodes.text.isnumeric() and edges.text.isnumeric():
-            self.graph_canvas.load_graph(random=(int(nodes.text), int(edges.text)))
+            self.graph_canvas.load_graph_async(random=(int(nodes.text), int(edges.text)),
+                                               on_error=lambda error: self.show_error(edges))
             self.dismiss()
         else:
             nodes.error = not nodes.text.isnumeric()
             edges.error = not edges.text.isnumeric()
 
+    def show_error(self, edges):
+        """Reopen the dialogue: there were too many edges for the nodes."""
+        self.open()
+        edges.error = True
+
     def check_if_digit(self, widget):
         if widget.text:
             widget.error = not widget.text[-1].isdigit()
@@ -100,6 +171,50 @@ class RandomGraphDialogue(ModalView, BackgroundColorBehavior):
                 widget.text = widget.text[:-1]
 
 
+class PlaybackBar(BoxLayout, BackgroundColorBehavior):
+    """Controls of graph_canvas.player: rewind, play/pause, fast-forward and a slider to scrub through steps."""
+    graph_canvas = ObjectProperty()
+    player = ObjectProperty(None, allownone=True)
+    status = StringProperty()
+
+    _event = None
+
+    def on_player(self, instance, player):
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+        if player is not None:
+            self.ids.slider.max = max(len(player.recording), 1)
+            self._event = Clock.schedule_interval(self.refresh, .1)
+            self.refresh()
+
+    def refresh(self, dt=None):
+        player = self.player
+        self.ids.slider.value = player.step
+        self.status = f'{player.step:,} / {len(player.recording):,}   {player.speed:+,g}/s'
+
+    def scrub(self, value):
+        if self.player is not None and int(value) != self.player.step:
+            self.player.pause()
+            self.player.seek(value)
+
+    def toggle(self):
+        if self.player.is_playing:
+            self.player.pause()
+        else:
+            self.player.play(PLAYBACK_SPEED)
+
+    def fast_forward(self, direction=1):
+        """Play in `direction` (-1 to rewind), twice as fast if already playing in that direction."""
+        speed = self.player.speed
+        self.player.play(2 * speed if speed * direction > 0 else direction * PLAYBACK_SPEED)
+
+    def close(self):
+        self.graph_canvas.stop_playback()
+        self.player = None
+
+
 class ColoredMenu(MDDropdownMenu):
     """Displays properties we can use to color nodes or edges."""
 
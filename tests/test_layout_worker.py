@@ -0,0 +1,78 @@
+"""
+The layout keeps moving vertices while a rule adds and removes them every frame.
+"""
+import time
+
+import numpy as np
+import pytest
+
+gt = pytest.importorskip('graph_tool')
+
+from graphvy.graph_canvas.layout_engines import LayoutEngine
+from graphvy.graph_canvas.layout_worker import LayoutWorker
+from graphvy.observable_graph import ObservableGraph
+
+TIMEOUT = 5  # seconds to wait for a layout step
+
+
+class ShiftEngine(LayoutEngine):
+    """Moves every unpinned vertex one unit right, so each vertex's expected position is known."""
+
+    def step(self, G, pos, pin):
+        positions = pos.get_2d_array((0, 1))
+        positions[0, ~pin.a.astype(bool)] += 1
+        pos.set_2d_array(positions)
+
+
+def wait_for_step(worker):
+    end = time.monotonic() + TIMEOUT
+    while worker._result is None:
+        assert time.monotonic() < end, 'layout step timed out'
+        time.sleep(.001)
+
+
+def test_positions_survive_vertex_changes():
+    rng = np.random.default_rng(0)
+    n = 20
+
+    G = ObservableGraph()
+    G.add_vertex(n)
+    G.add_edge_list(rng.integers(n, size=(30, 2)))
+    G.vp.pos = gt.group_vector_property([G.new_vertex_property('double', vals=coordinate)
+                                         for coordinate in rng.random((2, n))])
+    G.vp.ids = G.new_vertex_property('int', vals=np.arange(n))  # Moved along with renumbered vertices
+    next_id = n
+
+    worker = LayoutWorker(engine=ShiftEngine())
+    G.subscribe(worker)
+    generation = 0
+    try:
+        for frame in range(30):
+            pos = G.vp.pos.get_2d_array((0, 1))
+            posted = dict(zip(G.vp.ids.a.tolist(), pos[0].tolist()))  # Vertex id -> x
+            worker.post(generation, generation, G.get_edges(), pos, np.zeros(G.num_vertices(), dtype=bool))
+
+            # The rule removes a vertex and adds one while the layout steps.
+            G.remove_vertex(G.vertex(rng.integers(G.num_vertices())))
+            vertex = G.add_vertex()
+            G.vp.ids[vertex] = next_id
+            next_id += 1
+            G.add_edge(vertex, rng.integers(G.num_vertices()))
+            generation += 1
+
+            wait_for_step(worker)
+            result = worker.take(G.num_vertices())
+            assert result is not None
+            positions, known = result
+
+            ids = G.vp.ids.a
+            assert not known[int(vertex)]
+            assert known.sum() == G.num_vertices() - 1
+            expected = np.array([posted[id_] + 1 for id_ in ids[known].tolist()])
+            np.testing.assert_allclose(positions[0, known], expected)
+
+            pos = G.vp.pos.get_2d_array((0, 1))
+            pos[:, known] = positions[:, known]
+            G.vp.pos.set_2d_array(pos)
+    finally:
+        worker.stop()